@@ -1,8 +1,7 @@
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.gemini import GeminiModel
-from tools.attack_detection import detect_attack_func
+from agents.gemini import LazyGeminiModel
+from tools.inference_pool import detect_attack_async
 from common_classes import AttackDetectionResult, AnalysisResult, MyDeps
-from secretKeys import GEMINI_API_KEY
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,7 +12,7 @@ sys_prompt = (
     "traffic is significantly lower than attack traffic in the output; otherwise, return false."
 )
 
-model = GeminiModel(model_name='gemini-2.0-flash', api_key=GEMINI_API_KEY)
+model = LazyGeminiModel('gemini-2.0-flash')
 
 monitoring_agent = Agent(
     model=model,
@@ -25,8 +24,8 @@ monitoring_agent = Agent(
 )
 
 @monitoring_agent.tool
-def detect_attack(ctx: RunContext[MyDeps]) -> AttackDetectionResult:
+async def detect_attack(ctx: RunContext[MyDeps]) -> AttackDetectionResult:
     """Detect attacks in the specified PCAP file."""
     logger.info(f"Detecting attack in {ctx.deps.pathToFile}...")
-    output = detect_attack_func(ctx.deps.pathToFile)
+    output = ctx.deps.detection_output or await detect_attack_async(ctx.deps.pathToFile)
     return AttackDetectionResult(op=output or "Error: No output from detection function.")
\ No newline at end of file
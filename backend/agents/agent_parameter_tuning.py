@@ -1,7 +1,6 @@
 from pydantic_ai import Agent
-from pydantic_ai.models.gemini import GeminiModel
+from agents.gemini import LazyGeminiModel
 from common_classes import ParameterResult, MyDeps
-from secretKeys import GEMINI_API_KEY
 
 sys_prompt = (
     "You are a parameter tuning agent. Based on network conditions and previous analysis, "
@@ -10,7 +9,7 @@ sys_prompt = (
     "or packet loss > 5%; otherwise, decrease duration and increase interval."
 )
 
-model = GeminiModel(model_name='gemini-2.0-flash', api_key=GEMINI_API_KEY)
+model = LazyGeminiModel('gemini-2.0-flash')
 
 parameter_tuning_agent = Agent(
     model=model,
@@ -0,0 +1,32 @@
+from contextlib import asynccontextmanager
+from pydantic_ai.models import Model
+
+class LazyGeminiModel(Model):
+    """Gemini model whose client is built on the first request, so importing an agent needs no API key."""
+
+    def __init__(self, model_name: str = 'gemini-2.0-flash'):
+        self._model_name = model_name
+        self._model = None
+
+    def _resolve(self) -> Model:
+        if self._model is None:
+            from pydantic_ai.models.gemini import GeminiModel
+            from secretKeys import GEMINI_API_KEY
+            self._model = GeminiModel(model_name=self._model_name, api_key=GEMINI_API_KEY)
+        return self._model
+
+    async def request(self, *args, **kwargs):
+        return await self._resolve().request(*args, **kwargs)
+
+    @asynccontextmanager
+    async def request_stream(self, *args, **kwargs):
+        async with self._resolve().request_stream(*args, **kwargs) as response_stream:
+            yield response_stream
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def system(self) -> str:
+        return 'google-gla'
@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse, JSONResponse
 import asyncio
-from network_monitor import PerformanceMonitoringAgent, ParameterTuningAgent, SecurityAnalysisAgent
-from appWebsocket import broadcaster, websocket_endpoint
-from config import metrics_queue, attack_queue
+import time
+from appWebsocket import hub, broadcaster, websocket_endpoint, broadcast_stats
+from config import metrics_queue, attack_queue, METRICS_STORE, CLASSIFIER_WARM_UP, CLASSIFIER_WARM_UP_DELAY
+from metrics_store import MetricsStore
+from scheduler import MonitorScheduler, load_links
+from tools.attack_detection import classifier_stats, classifier_loaded
+from tools.inference_pool import shutdown_inference_pool, inference_pool_stats, warm_up_detection
+from instrumentation import REGISTRY, recent_spans
 from contextlib import asynccontextmanager
 import logging
 
@@ -14,33 +20,122 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Manage the application's lifecycle, initializing agents and tasks."""
     logger.info("Starting application...")
-    # Initialize inter-agent communication queues
-    performance_to_tuning_queue = asyncio.Queue()
-    tuning_to_performance_queue = asyncio.Queue()
-    performance_to_security_queue = asyncio.Queue()
-    security_to_performance_queue = asyncio.Queue()
-
-    # Instantiate agents with queues
-    performance_agent = PerformanceMonitoringAgent(
-        metrics_queue, performance_to_tuning_queue, tuning_to_performance_queue,
-        performance_to_security_queue, security_to_performance_queue
-    )
-    tuning_agent = ParameterTuningAgent(performance_to_tuning_queue, tuning_to_performance_queue)
-    security_agent = SecurityAnalysisAgent(performance_to_security_queue, security_to_performance_queue, attack_queue)
-
-    # Start background tasks
-    asyncio.create_task(performance_agent.run())
-    asyncio.create_task(tuning_agent.run())
-    asyncio.create_task(security_agent.run())
-    asyncio.create_task(broadcaster())
+    # Open the metrics history store
+    metrics_store = MetricsStore() if METRICS_STORE else None
+    app.state.metrics_store = metrics_store
+
+    # Start one set of agents per monitored interface/target link
+    links = load_links()
+    app.state.default_link = links[0].link_id
+    scheduler = MonitorScheduler(links, metrics_queue, attack_queue, metrics_store)
+    app.state.scheduler = scheduler
+    await scheduler.start()
+
+    # Export component stats alongside the stage histograms on /metrics
+    REGISTRY.register_collector("queue", scheduler.queue_depths, label="queue")
+    REGISTRY.register_collector("scheduler", scheduler.stats)
+    REGISTRY.register_collector("agents", scheduler.agent_stats)
+    REGISTRY.register_collector("broadcast", hub.stats)
+    REGISTRY.register_collector("classifier", classifier_stats)
+    REGISTRY.register_collector("inference_pool", inference_pool_stats)
+    if metrics_store is not None:
+        REGISTRY.register_collector("metrics_store", metrics_store.stats)
+
+    # Start background tasks; the classifier loads while metrics are already being collected
+    app.state.warm_up = asyncio.create_task(warm_up_detection(CLASSIFIER_WARM_UP_DELAY)) if CLASSIFIER_WARM_UP else None
+    background = [asyncio.create_task(broadcaster())]
+    if metrics_store is not None:
+        background.append(asyncio.create_task(metrics_store.run()))
     yield
     logger.info("Shutting down application...")
+    await scheduler.stop()
+    if app.state.warm_up is not None:
+        app.state.warm_up.cancel()
+    # Stop the periodic flush before the store closes, so it never writes to a closed database.
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    shutdown_inference_pool()
+    if metrics_store is not None:
+        metrics_store.close()
 
 # Initialize FastAPI application
 app = FastAPI(lifespan=lifespan)
 
 # Register WebSocket endpoint
 app.websocket("/ws")(websocket_endpoint)
+app.get("/ws/stats")(broadcast_stats)
+
+@app.get("/ready")
+async def ready(request: Request):
+    """Readiness of the service; responds 503 until attack detection can run without loading the model."""
+    warm_up_task = getattr(request.app.state, "warm_up", None)
+    if warm_up_task is None:
+        detection = "ready" if classifier_loaded() else "on_demand"
+    elif not warm_up_task.done():
+        detection = "loading"
+    elif warm_up_task.cancelled() or warm_up_task.exception() is not None:
+        detection = "failed"
+    else:
+        detection = "ready"
+    body = {"monitoring": hasattr(request.app.state, "scheduler"), "detection": detection}
+    if detection == "failed" and not warm_up_task.cancelled():
+        body["error"] = str(warm_up_task.exception())
+    return JSONResponse(body, status_code=200 if detection == "ready" else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latency histograms, queue depths and component counters in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces")
+async def traces(limit: int = 200):
+    """Recently sampled trace spans; empty unless TRACE_SAMPLE_RATE is above 0."""
+    return recent_spans(limit)
+
+def _history_store(request: Request) -> MetricsStore:
+    metrics_store = request.app.state.metrics_store
+    if metrics_store is None:
+        raise HTTPException(status_code=503, detail="Metrics store is disabled")
+    return metrics_store
+
+@app.get("/history/metrics")
+async def metrics_history(request: Request, fields: str = "external_latency,external_loss", link: str = None,
+                          start: float = None, end: float = None, resolution: int = None):
+    """Metric history of a link (default the first configured) over [start, end] (Unix seconds, default the last hour)."""
+    metrics_store = _history_store(request)
+    link = request.app.state.default_link if link is None else link
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    return await asyncio.to_thread(metrics_store.query, fields.split(","), start, end, resolution, link=link)
+
+@app.get("/history/fields")
+async def metrics_fields(request: Request):
+    """Names of the stored metric series per link."""
+    return await asyncio.to_thread(_history_store(request).fields)
+
+@app.get("/history/verdicts")
+async def verdict_history(request: Request, link: str = None, start: float = None, end: float = None, limit: int = 1000):
+    """Attack verdicts over [start, end] for one link or all of them, newest first."""
+    metrics_store = _history_store(request)
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    return await asyncio.to_thread(metrics_store.verdicts, start, end, limit, link)
+
+@app.post("/reanalyze")
+async def reanalyze_window(request: Request, start: float, end: float, link: str = None):
+    """Classify a past capture window [start, end] (Unix seconds) again from the retained ring buffer segments."""
+    link = request.app.state.default_link if link is None else link
+    try:
+        return await request.app.state.scheduler.reanalyze_window(link, start, end)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/links")
+async def monitored_links(request: Request):
+    """Monitored links and scheduler counters."""
+    scheduler = request.app.state.scheduler
+    return {"links": [link.labels for link in scheduler.links], "scheduler": scheduler.stats()}
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,45 +1,159 @@
 from fastapi import WebSocket, WebSocketDisconnect
 import asyncio
-from config import metrics_queue, attack_queue, connected_clients
+import contextlib
+import json
+import time
+from collections import deque
+from config import metrics_queue, attack_queue, WS_CLIENT_QUEUE_SIZE, WS_SEND_TIMEOUT
+from instrumentation import stage, BROADCAST_SEND_SECONDS
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def broadcaster():
-    """Broadcast metrics and attack detection results to WebSocket clients."""
-    while True:
-        if not metrics_queue.empty():
-            metrics = await metrics_queue.get()
-            logger.info(f"Metrics at {metrics['timestamp']}: "
-                        f"Throughput Sent: {metrics['throughput_sent']:.2f} B/s, "
-                        f"Throughput Recv: {metrics['throughput_recv']:.2f} B/s, "
-                        f"Avg Latency: {metrics['aggregates']['avg_latency']:.2f} ms, "
-                        f"Avg Loss: {metrics['aggregates']['avg_loss']:.2f}%")
-            for client in connected_clients:
+def _fmt(value, spec=".2f"):
+    return "n/a" if value is None else format(value, spec)
+
+class ClientChannel:
+    """Bounded outgoing queue and sender task for one WebSocket client."""
+
+    def __init__(self, websocket: WebSocket, hub: "BroadcastHub"):
+        self.websocket = websocket
+        self.hub = hub
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self._send_loop())
+
+    def enqueue(self, message_type: str, link: str, text: str) -> None:
+        if message_type == "metrics":
+            # Only the newest metrics snapshot of a link matters; replace any that has not been sent yet.
+            for index, (queued_type, queued_link, _) in enumerate(self.pending):
+                if queued_type == "metrics" and queued_link == link:
+                    del self.pending[index]
+                    self.hub.coalesced += 1
+                    break
+        self.pending.append((message_type, link, text))
+        while len(self.pending) > self.hub.client_queue_size:
+            self.pending.popleft()
+            self.hub.dropped += 1
+        self.ready.set()
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self.ready.wait()
+            while self.pending:
+                _, _, text = self.pending.popleft()
+                started = time.perf_counter()
                 try:
-                    await client.send_json({"type": "metrics", "data": metrics})
+                    await asyncio.wait_for(self.websocket.send_text(text), self.hub.send_timeout)
                 except Exception as e:
-                    logger.error(f"Error sending metrics to client: {e}")
-        if not attack_queue.empty():
-            attack_result = await attack_queue.get()
+                    logger.error(f"Error sending to client, disconnecting it: {e}")
+                    self.hub.evicted += 1
+                    self.hub.unregister(self.websocket)
+                    await self.close()
+                    return
+                self.hub.record_send(time.perf_counter() - started)
+            self.ready.clear()
+
+    async def close(self) -> None:
+        """Close the socket so the client sees the disconnect and reconnects; its endpoint's receive loop then ends."""
+        with contextlib.suppress(Exception):
+            # 1013 "try again later": the client fell behind rather than did anything wrong.
+            await asyncio.wait_for(self.websocket.close(code=1013), self.hub.send_timeout)
+
+class BroadcastHub:
+    """Fans every metrics and attack message out to all WebSocket clients.
+
+    Each message is serialized once; every client has its own bounded queue and sender task,
+    so a slow dashboard only delays itself. Unsent metrics snapshots are coalesced to the
+    newest one per link, the oldest messages are dropped when a queue overflows, and clients whose
+    send fails or times out are evicted.
+    """
+
+    def __init__(self, client_queue_size: int = WS_CLIENT_QUEUE_SIZE, send_timeout: float = WS_SEND_TIMEOUT):
+        self.client_queue_size = client_queue_size
+        self.send_timeout = send_timeout
+        self.clients = {}
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.evicted = 0
+        self.send_seconds_total = 0.0
+        self.send_seconds_max = 0.0
+
+    def register(self, websocket: WebSocket) -> None:
+        self.clients[websocket] = ClientChannel(websocket, self)
+
+    def unregister(self, websocket: WebSocket) -> None:
+        channel = self.clients.pop(websocket, None)
+        if channel is not None and channel.task is not asyncio.current_task():
+            channel.task.cancel()
+
+    def record_send(self, seconds: float) -> None:
+        self.sent += 1
+        self.send_seconds_total += seconds
+        self.send_seconds_max = max(self.send_seconds_max, seconds)
+        BROADCAST_SEND_SECONDS.observe(seconds)
+
+    def publish(self, message_type: str, data: dict) -> None:
+        with stage("broadcast"):
+            text = json.dumps({"type": message_type, "data": data}, separators=(",", ":"), ensure_ascii=False)
+            link = data.get("link")
+            for channel in list(self.clients.values()):
+                channel.enqueue(message_type, link, text)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "evicted": self.evicted,
+            "send_latency_avg_ms": self.send_seconds_total / self.sent * 1000 if self.sent else 0.0,
+            "send_latency_max_ms": self.send_seconds_max * 1000,
+        }
+
+    async def _pump_metrics(self, queue: asyncio.Queue) -> None:
+        while True:
+            metrics = await queue.get()
+            aggregates = metrics.get("aggregates", {})
+            logger.info(f"Metrics for {metrics.get('link')} at {metrics['timestamp']}: "
+                        f"Throughput Sent: {_fmt(metrics['throughput_sent'])} B/s, "
+                        f"Throughput Recv: {_fmt(metrics['throughput_recv'])} B/s, "
+                        f"Avg Latency: {_fmt(aggregates.get('avg_latency'))} ms, "
+                        f"Avg Loss: {_fmt(aggregates.get('avg_loss'))}%")
+            self.publish("metrics", metrics)
+
+    async def _pump_attacks(self, queue: asyncio.Queue) -> None:
+        while True:
+            attack_result = await queue.get()
             logger.info(f"Attack Detection Result: {attack_result}")
-            for client in connected_clients:
-                try:
-                    await client.send_json({"type": "attack_detection", "data": attack_result})
-                except Exception as e:
-                    logger.error(f"Error sending attack result to client: {e}")
-        await asyncio.sleep(0.1)
+            self.publish("attack_progress" if attack_result.get("partial") else "attack_detection", attack_result)
+
+    async def run(self, metrics_queue: asyncio.Queue, attack_queue: asyncio.Queue) -> None:
+        """Wait on both queues at once and publish whatever arrives first."""
+        await asyncio.gather(self._pump_metrics(metrics_queue), self._pump_attacks(attack_queue))
+
+hub = BroadcastHub()
+
+async def broadcaster():
+    """Broadcast metrics and attack detection results to WebSocket clients."""
+    await hub.run(metrics_queue, attack_queue)
 
 async def websocket_endpoint(websocket: WebSocket):
     """Handle WebSocket client connections."""
     await websocket.accept()
-    connected_clients.add(websocket)
+    hub.register(websocket)
     logger.info("Client connected")
     try:
         while True:
             await websocket.receive_text()  # Keep connection alive
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
         logger.info("Client disconnected")
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
\ No newline at end of file
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        hub.unregister(websocket)
+
+async def broadcast_stats():
+    """Report WebSocket fan-out counters."""
+    return hub.stats()
@@ -0,0 +1,111 @@
+"""Compare the classifier's inference backends on the same traffic: agreement with eager PyTorch, speed and memory.
+
+Usage (from backend/):
+    python -m benchmarks.backend_parity [--pcap FILE ...] [--packets N] [--model DIR]
+                                        [--backends eager quantized onnx onnx_int8] [--threads N] [--output FILE]
+
+Captures are parsed and flow-sampled once, exactly as PcapClassifier.classify_pcap does,
+and the unique feature strings are then predicted by every backend. Each backend runs in
+its own fresh process so peak RSS is its own, after a first load in another process that
+creates any export (TorchScript, ONNX) it needs. With the default --threads 1 the
+throughput is per core. The report gives, per backend, the share of feature strings whose
+class matches eager, the attack class counts and their overlap with eager's counts, load
+time, inferences per second, and resident memory once loaded and at peak. Without --pcap and --model it uses the same
+synthetic capture and tiny offline model as pipeline_benchmark.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import logging
+import psutil
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.fixtures import write_synthetic_pcap, make_tiny_model
+from benchmarks.pipeline_benchmark import _peak_rss_mb
+
+def _run_backend(backend, model_dir, lines, threads, batch_size):
+    from tools.attack_detection import PcapClassifier
+    classifier = PcapClassifier(model_dir, batch_size=batch_size, num_threads=threads, backend=backend)
+    loaded_rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+    classifier.predict(lines[:batch_size])
+    started = time.perf_counter()
+    predictions = classifier.predict(lines)
+    seconds = time.perf_counter() - started
+    return {
+        "backend": classifier.backend.name,
+        "load_seconds": classifier.load_seconds,
+        "inference_seconds": seconds,
+        "inferences_per_sec": len(lines) / seconds if seconds > 0 else 0.0,
+        "loaded_rss_mb": loaded_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }, predictions
+
+def _in_fresh_process(*args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run_backend, *args).result()
+
+def _count_overlap(counts, reference):
+    """Share of packets that land in the same class count as the reference: 1.0 means identical counts."""
+    total = sum(reference.values())
+    return sum(min(count, reference.get(attack, 0)) for attack, count in counts.items()) / total if total else 1.0
+
+def compare(backends, model_dir, paths, threads, batch_size):
+    from tools.attack_detection import PcapClassifier, VerdictCache, CLASSES
+    plans = [PcapClassifier.plan_pcap(path, VerdictCache(maxsize=0)) for path in paths]
+    pending = [plan.pending() for plan in plans]
+    lines = [line for plan_lines in pending for line in plan_lines]
+    results, reference = {}, None
+    for backend in backends:
+        _in_fresh_process(backend, model_dir, lines[:1], threads, batch_size)
+        result, predictions = _in_fresh_process(backend, model_dir, lines, threads, batch_size)
+        counts, offset = {}, 0
+        for plan, plan_lines in zip(plans, pending):
+            for attack, count in plan.resolve(plan_lines, predictions[offset:offset + len(plan_lines)], CLASSES).items():
+                counts[attack] = counts.get(attack, 0) + count
+            offset += len(plan_lines)
+        if reference is None:
+            reference = {"backend": backend, "predictions": predictions, "counts": counts, "result": result}
+        same = sum(a == b for a, b in zip(predictions, reference["predictions"]))
+        result.update({
+            "reference": reference["backend"],
+            "prediction_agreement": same / len(lines) if lines else 1.0,
+            "count_overlap": _count_overlap(counts, reference["counts"]),
+            "speedup": result["inferences_per_sec"] / reference["result"]["inferences_per_sec"],
+            "attack_counts": dict(sorted(counts.items(), key=lambda item: -item[1])),
+        })
+        results[backend] = result
+    return {"packets": sum(plan.packets for plan in plans), "unique_lines": len(lines), "backends": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pcap", nargs="*", default=[], help="captures to compare on instead of a synthetic one")
+    parser.add_argument("--packets", type=int, default=20_000, help="size of the synthetic capture")
+    parser.add_argument("--model", help="classifier directory or hub name; default builds a tiny offline model")
+    parser.add_argument("--backends", nargs="+", default=["eager", "quantized", "onnx", "onnx_int8"],
+                        help="backends to compare; the first is the reference")
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads per backend")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="netmon-parity-")
+    model_dir = args.model or make_tiny_model(os.path.join(workdir, "tiny-model"))
+    paths = args.pcap or [write_synthetic_pcap(os.path.join(workdir, "synthetic.pcap"), packets=args.packets)]
+    # Keep exports out of the service's data directory; the spawned backends read this from config.
+    os.environ["CLASSIFIER_ONNX_DIR"] = os.path.join(workdir, "onnx")
+    report = {
+        "model": model_dir if args.model else "tiny-offline",
+        "threads": args.threads,
+        **compare(args.backends, model_dir, paths, args.threads, args.batch_size),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
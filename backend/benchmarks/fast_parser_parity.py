@@ -0,0 +1,65 @@
+"""Check that the fast pcap parser produces the same feature strings as the scapy path.
+
+Usage (from backend/):
+    python -m benchmarks.fast_parser_parity [capture.pcap ...]
+
+Without arguments a set of synthetic captures covering the supported link types,
+Ethernet padding, VLAN tags, fragments and non-TCP traffic is generated and checked.
+"""
+import os
+import sys
+import tempfile
+from scapy.all import PcapReader, Ether, Dot1Q, CookedLinux, Loopback, IP, TCP, UDP, Raw, wrpcap
+from tools.attack_detection import PcapClassifier
+from tools.fast_pcap import PcapFile, MAX_INPUT_CHARS
+
+def _synthetic_packets():
+    payloads = [b"", b"GET / HTTP/1.1\r\n\r\n", bytes(range(256)) * 3]
+    tcp = [IP(src="10.0.0.1", dst="10.0.0.2", ttl=ttl, tos=tos) / TCP(sport=40000 + i, dport=443) / Raw(p)
+           for i, (ttl, tos, p) in enumerate(zip((64, 128, 1), (0, 0x10, 0xb8), payloads))]
+    tcp.append(IP(options=b"\x01\x01\x01\x00") / TCP(sport=1, dport=2, options=[("MSS", 1460)]))
+    other = [IP() / UDP() / Raw(b"dns"), IP(frag=10, proto=6) / Raw(b"x" * 30)]
+    return tcp, other
+
+def synthetic_captures(directory):
+    """Write one capture per supported link type and return their paths."""
+    tcp, other = _synthetic_packets()
+    captures = {
+        "ethernet": [Ether() / p for p in tcp + other] + [Ether(bytes(Ether() / IP() / TCP()) + b"\x00" * 6)],
+        "vlan": [Ether() / Dot1Q(vlan=7) / p for p in tcp + other],
+        "linux_sll": [CookedLinux(proto=0x0800) / p for p in tcp + other],
+        "loopback": [Loopback(type=2) / p for p in tcp + other],
+        "raw_ip": tcp + other,
+    }
+    paths = []
+    for name, packets in captures.items():
+        path = os.path.join(directory, f"{name}.pcap")
+        wrpcap(path, packets)
+        paths.append(path)
+    return paths
+
+def compare(path):
+    """Return a list of (index, scapy_line, fast_line) for packets whose feature strings differ."""
+    with PcapReader(path) as pcap:
+        expected = [line[:MAX_INPUT_CHARS] for line in map(PcapClassifier.processing_packet_conversion, pcap) if line]
+    with PcapFile(path) as pcap:
+        actual = list(pcap.lines())
+    mismatches = [(i, e, a) for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    if len(expected) != len(actual):
+        mismatches.append((min(len(expected), len(actual)), f"{len(expected)} lines", f"{len(actual)} lines"))
+    return mismatches
+
+def main(paths):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = paths or synthetic_captures(directory)
+        failed = False
+        for path in paths:
+            mismatches = compare(path)
+            print(f"{os.path.basename(path)}: {'OK' if not mismatches else f'{len(mismatches)} mismatches'}")
+            for index, expected, actual in mismatches[:5]:
+                print(f"  packet {index}:\n    scapy: {expected[:120]}\n    fast:  {actual[:120]}")
+            failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,68 @@
+"""Offline stand-ins shared by the benchmarks: synthetic captures and a tiny classifier model.
+
+Captures are written with struct rather than scapy so large ones are cheap to generate.
+The model is a randomly initialised two-layer BERT with the real label count and a numeric
+vocabulary, so it exercises the same tokenizer and forward-pass code as the real classifier.
+"""
+import os
+import random
+import struct
+
+_PCAP_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    return ~(total + (total >> 16)) & 0xFFFF
+
+def _frame(src: str, dst: str, sport: int, dport: int, flags: int, ttl: int, payload: bytes) -> bytes:
+    tcp = struct.pack("!HHIIBBHHH", sport, dport, 0, 0, 5 << 4, flags, 65535, 0, 0) + payload
+    ip_header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp), 0, 0x4000, ttl, 6, 0,
+                            bytes(map(int, src.split("."))), bytes(map(int, dst.split("."))))
+    ip_header = ip_header[:10] + struct.pack("!H", _checksum(ip_header)) + ip_header[12:]
+    return b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00" + ip_header + tcp
+
+def write_synthetic_pcap(path: str, packets: int = 10_000, flows: int = 200, scan_fraction: float = 0.2,
+                         seed: int = 0) -> str:
+    """Write an Ethernet/IPv4/TCP capture mixing request/response flows with a SYN port scan."""
+    rng = random.Random(seed)
+    flow_table = [(f"10.0.{i // 250}.{i % 250 + 1}", "192.168.1.10", rng.randint(1024, 65535), rng.choice((80, 443, 22)))
+                  for i in range(flows)]
+    payloads = [b"", b"GET / HTTP/1.1\r\nHost: example\r\n\r\n", bytes(rng.getrandbits(8) for _ in range(512))]
+    timestamp = 1_700_000_000.0
+    with open(path, "wb") as f:
+        f.write(_PCAP_HEADER)
+        for index in range(packets):
+            if rng.random() < scan_fraction:
+                frame = _frame("172.16.0.66", "192.168.1.10", 40000, 1 + index % 1024, 0x02, 64, b"")
+            else:
+                src, dst, sport, dport = rng.choice(flow_table)
+                if rng.random() < 0.5:
+                    src, dst, sport, dport = dst, src, dport, sport
+                frame = _frame(src, dst, sport, dport, 0x18, rng.choice((64, 128)), rng.choice(payloads))
+            timestamp += rng.expovariate(1000)
+            seconds = int(timestamp)
+            f.write(struct.pack("<IIII", seconds, int((timestamp - seconds) * 1e6), len(frame), len(frame)))
+            f.write(frame)
+    return path
+
+def make_tiny_model(directory: str, num_labels: int = 24, seed: int = 0) -> str:
+    """Save a tiny BERT sequence classifier and tokenizer loadable with from_pretrained."""
+    if os.path.exists(os.path.join(directory, "config.json")):
+        return directory
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+    os.makedirs(directory, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "-"] + [str(i) for i in range(1000)]
+    vocab_path = os.path.join(directory, "vocab.txt")
+    with open(vocab_path, "w") as f:
+        f.write("\n".join(vocab))
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=512, num_labels=num_labels,
+                        initializer_range=1.0)
+    BertForSequenceClassification(config).save_pretrained(directory)
+    BertTokenizerFast(vocab_path, model_max_length=512).save_pretrained(directory)
+    return directory
@@ -0,0 +1,81 @@
+"""Check the in-process ping against the loopback interface in every mode this host supports.
+
+Usage (from backend/):
+    python -m benchmarks.icmp_prober_check [host]
+
+Pings the host (127.0.0.1 by default) with the ICMP socket the kernel allows, then with the
+TCP fallback, and with an event loop that cannot watch sockets, as Windows' proactor loop;
+every mode must see no loss. Echo replies with and without a leading IPv4 header, as
+macOS datagram sockets and raw sockets deliver them, must both be matched to their probe.
+"""
+import asyncio
+import struct
+import sys
+from icmp_prober import IcmpProber, ICMP_ECHO_REPLY
+
+class _NoReaderLoop(asyncio.SelectorEventLoop):
+    def add_reader(self, fd, callback, *args):
+        raise NotImplementedError
+
+class _ReplySocket:
+    """Stands in for the ICMP socket and returns one prepared reply."""
+
+    def __init__(self, packet, address):
+        self._replies = [(packet, (address, 0))]
+
+    def recvfrom(self, size):
+        if not self._replies:
+            raise BlockingIOError
+        return self._replies.pop()
+
+async def _ping(host, mode=None):
+    prober = IcmpProber()
+    if mode is not None:
+        prober._loop = asyncio.get_running_loop()
+        prober.mode = mode
+    try:
+        metrics = await prober.ping(host, count=3, timeout=1, interval=0.05)
+        return prober.mode, metrics
+    finally:
+        prober.close()
+
+async def _reply_matched(with_ip_header, address="127.0.0.1"):
+    prober = IcmpProber()
+    prober._loop = asyncio.get_running_loop()
+    prober.mode = "dgram"
+    reply = struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, prober._ident, 7) + b"payload"
+    if with_ip_header:
+        reply = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(reply), 0, 0, 64, 1, 0,
+                            bytes(4), bytes(4)) + reply
+    waiter = prober._waiters[(address, 7)] = prober._loop.create_future()
+    prober._sock = _ReplySocket(reply, address)
+    prober._on_readable()
+    return waiter.done()
+
+def main(host):
+    results = {
+        "default": asyncio.run(_ping(host)),
+        "tcp": asyncio.run(_ping(host, "tcp")),
+    }
+    loop = _NoReaderLoop()
+    try:
+        results["no add_reader"] = loop.run_until_complete(_ping(host))
+    finally:
+        loop.close()
+    failed = False
+    for name, (mode, metrics) in results.items():
+        ok = metrics["packet_loss"] == 0 and metrics["avg_latency"] is not None
+        print(f"{name}: mode {mode}, loss {metrics['packet_loss']}%, latency {metrics['avg_latency']} ms "
+              f"{'OK' if ok else 'FAILED'}")
+        failed = failed or not ok
+    if results["no add_reader"][0] != "tcp":
+        print("no add_reader: expected the TCP fallback FAILED")
+        failed = True
+    for with_ip_header in (False, True):
+        ok = asyncio.run(_reply_matched(with_ip_header))
+        print(f"reply {'with' if with_ip_header else 'without'} IPv4 header: {'OK' if ok else 'FAILED'}")
+        failed = failed or not ok
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"))
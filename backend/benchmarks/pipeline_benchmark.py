@@ -0,0 +1,216 @@
+"""Replay captures through the detection pipeline offline and report throughput, latency and memory.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline_benchmark [--pcap FILE ...] [--packets N] [--cycles N]
+                                            [--sustain SECONDS] [--capture-seconds S]
+                                            [--model DIR] [--output FILE]
+
+Without --pcap a synthetic capture is generated, and without --model a tiny random BERT
+is built in a temporary directory, so nothing touches the network. The replay phase runs
+PcapClassifier.classify_pcap over each capture with a cold and a warm verdict cache. The
+pipeline phase runs the real agents for one link with pydantic-ai's TestModel in place of
+Gemini, a fake tshark on PATH that copies the replay capture, and simulated pings that
+always look anomalous. The sustained phase keeps that link permanently anomalous for
+--sustain seconds, once with lock-step cycles and once with CYCLE_MAX_IN_FLIGHT pipelined
+cycles, and reports detection throughput in cycles per minute; the verdict cache is off
+in this phase so each cycle pays for a full analysis. The report is one JSON
+object, written to --output if given.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import logging
+from benchmarks.fixtures import write_synthetic_pcap, make_tiny_model
+
+_FAKE_TSHARK = """#!{python}
+import os, shutil, sys, time
+args = sys.argv[1:]
+out = args[args.index("-w") + 1]
+time.sleep(float(os.environ.get("FAKE_TSHARK_SECONDS", "0.05")))
+if out == "-":
+    with open(os.environ["FAKE_TSHARK_PCAP"], "rb") as f:
+        sys.stdout.buffer.write(f.read())
+else:
+    shutil.copyfile(os.environ["FAKE_TSHARK_PCAP"], out)
+"""
+
+def _summary(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        "count": len(samples),
+        "mean_s": statistics.fmean(samples),
+        "p50_s": samples[len(samples) // 2],
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_s": samples[-1],
+    }
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _offline_environment(workdir, pcap):
+    """Put a fake tshark that replays `pcap` first on PATH."""
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    tshark = os.path.join(bin_dir, "tshark")
+    with open(tshark, "w") as f:
+        f.write(_FAKE_TSHARK.format(python=sys.executable))
+    os.chmod(tshark, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_TSHARK_PCAP"] = pcap
+
+def bench_replay(paths, model_dir):
+    from tools.attack_detection import PcapClassifier, VerdictCache
+    started = time.perf_counter()
+    classifier = PcapClassifier(model_dir)
+    load_seconds = time.perf_counter() - started
+    captures = []
+    for path in paths:
+        result = {"path": path}
+        classifier.cache = VerdictCache()
+        for phase in ("cold", "warm"):
+            classifier.classify_pcap(path)
+            stats = classifier.last_stats
+            result["packets"] = stats["packets"]
+            result[phase] = {key: stats[key] for key in ("seconds", "packets_per_sec", "inferred", "cache_hit_rate")}
+        captures.append(result)
+    return {"backend": classifier.backend.name, "model_load_seconds": load_seconds, "captures": captures}
+
+async def _degraded_ping(host, count=4, timeout=2):
+    await asyncio.sleep(0.001)
+    return {"packet_loss": 12.0, "avg_latency": 150.0}
+
+def _bench_link(workdir):
+    """One monitored link whose pings always look degraded, so every check starts a cycle."""
+    import network_monitor
+    from common_classes import LinkConfig
+    from scheduler import MonitoredLink
+    network_monitor.get_ping_metrics = _degraded_ping
+    link = LinkConfig(interface="bench0", target="192.0.2.1", gateway="192.0.2.254")
+    return MonitoredLink(link, asyncio.Queue(), asyncio.Queue(), capture_path=os.path.join(workdir, "capture.pcap"))
+
+@contextlib.asynccontextmanager
+async def _agents_running(monitored):
+    """Run the link's tuning and security agents with TestModel standing in for Gemini."""
+    from agents.agent_monitoring import monitoring_agent
+    from agents.agent_parameter_tuning import parameter_tuning_agent
+    from pydantic_ai.models.test import TestModel
+    loops = [asyncio.create_task(monitored.tuning_agent.run()), asyncio.create_task(monitored.security_agent.run())]
+    try:
+        with monitoring_agent.override(model=TestModel()), parameter_tuning_agent.override(model=TestModel()):
+            yield
+    finally:
+        for task in loops:
+            task.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+
+async def bench_pipeline(workdir, cycles):
+    monitored = _bench_link(workdir)
+    agent = monitored.performance_agent
+    collect_latencies, cycle_latencies = [], []
+    async with _agents_running(monitored):
+        for _ in range(cycles):
+            started = time.perf_counter()
+            await agent.collect_metrics()
+            collect_latencies.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await agent.run_cycle()
+            cycle_latencies.append(time.perf_counter() - started)
+    return {
+        "cycles": len(cycle_latencies),
+        "first_cycle_seconds": cycle_latencies[0] if cycle_latencies else None,
+        "cycle_latency": _summary(cycle_latencies[1:] or cycle_latencies),
+        "collect_metrics_latency": _summary(collect_latencies),
+        "verdict_engine": monitored.security_agent.verdict_engine.stats(),
+    }
+
+async def bench_sustained(workdir, seconds, max_in_flight):
+    """Start cycles whenever the link's executor allows, as anomaly_checking_loop does, and count completions."""
+    from tools.attack_detection import get_classifier, VerdictCache
+    # Every fake capture replays the same packets, so a warm verdict cache would make analysis free.
+    get_classifier().cache = VerdictCache(maxsize=0)
+    monitored = _bench_link(workdir)
+    agent = monitored.performance_agent
+    agent.executor.max_in_flight = max_in_flight
+    async with _agents_running(monitored):
+        started = time.monotonic()
+        while time.monotonic() - started < seconds:
+            await agent.collect_metrics()
+            if agent.executor.can_start() and agent._should_capture():
+                agent.executor.start(agent.run_cycle)
+        outcomes = dict(agent.executor.outcomes)
+        await agent.executor.stop()
+    completed = sum(outcomes.values())
+    return {
+        "max_in_flight": max_in_flight,
+        "seconds": seconds,
+        "cycles_completed": completed,
+        "cycles_per_minute": completed * 60 / seconds,
+        "outcomes": outcomes,
+        "stale_replies": agent.tuning_replies.stale + agent.analysis_replies.stale,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pcap", nargs="*", default=[], help="captures to replay instead of a synthetic one")
+    parser.add_argument("--packets", type=int, default=20_000, help="size of the synthetic capture")
+    parser.add_argument("--cycles", type=int, default=5, help="anomaly cycles to run through the agents; 0 skips")
+    parser.add_argument("--sustain", type=float, default=20, help="seconds of back-to-back cycles per mode; 0 skips")
+    parser.add_argument("--capture-seconds", type=float, default=1.0, help="how long each fake capture takes when sustained")
+    parser.add_argument("--model", help="classifier directory or hub name; default builds a tiny offline model")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="netmon-bench-")
+    started = time.perf_counter()
+    model_dir = args.model or make_tiny_model(os.path.join(workdir, "tiny-model"))
+    paths = args.pcap or [write_synthetic_pcap(os.path.join(workdir, "synthetic.pcap"), packets=args.packets)]
+    setup_seconds = time.perf_counter() - started
+    # The classifier reads its model from config, so point it at the stand-in before the pipeline is imported.
+    os.environ["CLASSIFIER_MODEL"] = model_dir
+    _offline_environment(workdir, paths[0])
+
+    import torch
+    import transformers
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+        },
+        "model": model_dir if args.model else "tiny-offline",
+        "setup_seconds": setup_seconds,
+        "replay": bench_replay(paths, model_dir),
+    }
+    if args.cycles:
+        report["pipeline"] = asyncio.run(bench_pipeline(workdir, args.cycles))
+    if args.sustain:
+        from config import CYCLE_MAX_IN_FLIGHT
+        os.environ["FAKE_TSHARK_SECONDS"] = str(args.capture_seconds)
+        report["sustained"] = {
+            "lock_step": asyncio.run(bench_sustained(workdir, args.sustain, 1)),
+            "pipelined": asyncio.run(bench_sustained(workdir, args.sustain, CYCLE_MAX_IN_FLIGHT)),
+        }
+    report["peak_rss_mb"] = _peak_rss_mb()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
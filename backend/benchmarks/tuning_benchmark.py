@@ -0,0 +1,81 @@
+"""Compare decision latency of the local heuristic tuner and the LLM parameter tuning agent.
+
+Usage (from backend/):
+    python -m benchmarks.tuning_benchmark [--samples N] [--live]
+
+The LLM mode runs the real agent through pydantic-ai's TestModel so it works offline and
+measures the agent round-trip without network time; pass --live to call Gemini instead
+(needs secretKeys.GEMINI_API_KEY). Results are printed as one JSON object.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from tools.tuning_engine import HeuristicTuner
+
+def _samples(count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.uniform(5, 200), rng.uniform(0, 20), rng.random() < 0.2) for _ in range(count)]
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        "decisions": len(latencies),
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+def bench_local(samples):
+    tuner = HeuristicTuner()
+    results = {}
+    for phase in ("cold", "warm"):
+        latencies = []
+        for avg_latency, avg_loss, attack in samples:
+            started = time.perf_counter()
+            tuner.tune(avg_latency, avg_loss, attack)
+            latencies.append(time.perf_counter() - started)
+        results[phase] = _summary(latencies)
+    results["memo_entries"] = len(tuner.memo)
+    return results
+
+async def bench_llm(samples, live):
+    from agents.agent_parameter_tuning import parameter_tuning_agent
+    from common_classes import MyDeps
+    from network_monitor import ParameterTuningAgent
+    latencies = []
+
+    async def run_all():
+        for avg_latency, avg_loss, attack in samples:
+            prompt = ParameterTuningAgent.tuning_prompt(avg_latency, avg_loss, attack)
+            started = time.perf_counter()
+            await parameter_tuning_agent.run(user_prompt=prompt, deps=MyDeps())
+            latencies.append(time.perf_counter() - started)
+
+    if live:
+        await run_all()
+    else:
+        from pydantic_ai.models.test import TestModel
+        with parameter_tuning_agent.override(model=TestModel()):
+            await run_all()
+    return _summary(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--llm-samples", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of pydantic-ai's TestModel")
+    args = parser.parse_args()
+    samples = _samples(args.samples)
+    report = {"local": bench_local(samples)}
+    try:
+        report["llm"] = asyncio.run(bench_llm(samples[:args.llm_samples], args.live))
+        report["llm"]["mode"] = "live" if args.live else "test_model"
+    except ImportError as e:
+        report["llm"] = {"skipped": str(e)}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
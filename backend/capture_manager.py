@@ -0,0 +1,350 @@
+import asyncio
+import glob
+import os
+import re
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from config import (INTERFACE, CAPTURE_DIR, CAPTURE_SEGMENT_SECONDS, CAPTURE_SEGMENT_KB,
+                    CAPTURE_DISK_QUOTA_MB, CAPTURE_POLL_INTERVAL, CAPTURE_RESTART_DELAY, STREAMING_POLL_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+# tshark names ring buffer files <prefix>_<5-digit sequence>_<YYYYmmddHHMMSS>.pcap
+_SEGMENT_NAME = re.compile(r"_(\d+)_(\d{14})\.pcap$")
+
+def _segment_start(stamp: str) -> float:
+    return time.mktime(time.strptime(stamp, "%Y%m%d%H%M%S"))
+
+class CaptureUnavailableError(RuntimeError):
+    """The ring buffer capture stopped before it covered the requested window."""
+
+@dataclass
+class Segment:
+    seq: int
+    path: str
+    start: float
+    end: Optional[float] = None  # None while tshark is still writing the file
+    size: int = 0
+    leases: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+class CaptureManager:
+    """Persistent tshark ring buffer that hands completed capture segments to the analysis pipeline.
+
+    tshark rotates the output file by time and size; the manager indexes each segment by
+    sequence number and time range, wakes windows waiting for segments to complete, and keeps
+    the directory under a disk quota by deleting the oldest segments that are not leased.
+    Segments left by earlier runs are indexed as complete on start, so past windows can be
+    analyzed again until the quota evicts them.
+    A tshark that exits is restarted after `restart_delay` seconds; windows it failed to
+    cover raise CaptureUnavailableError rather than coming back empty.
+    """
+
+    def __init__(self, interface: str = INTERFACE, directory: str = CAPTURE_DIR,
+                 segment_seconds: int = CAPTURE_SEGMENT_SECONDS, segment_kb: int = CAPTURE_SEGMENT_KB,
+                 quota_mb: int = CAPTURE_DISK_QUOTA_MB, poll_interval: float = CAPTURE_POLL_INTERVAL,
+                 restart_delay: float = CAPTURE_RESTART_DELAY):
+        self.interface = interface
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.segment_kb = segment_kb
+        self.quota_bytes = quota_mb * 1024 * 1024
+        self.poll_interval = poll_interval
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.segments = []
+        self._known = {}
+        self._changed = asyncio.Condition()
+        self._process = None
+        self._watcher = None
+        self._stopping = asyncio.Event()
+        self._seq_base = 0
+        self._max_seq = 0
+        # Guards the segment index and leases against SegmentFollower reader threads.
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    def capture_command(self) -> list:
+        return [
+            "tshark", "-i", self.interface, "-q", "-F", "pcap",
+            "-b", f"duration:{self.segment_seconds}", "-b", f"filesize:{self.segment_kb}",
+            "-w", os.path.join(self.directory, "ring.pcap")
+        ]
+
+    async def _spawn(self) -> bool:
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                *self.capture_command(), stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            logger.error(f"Could not start ring buffer capture on {self.interface}: {e}")
+            return False
+        return True
+
+    async def start(self) -> bool:
+        """Start tshark and the segment watcher; return False, with nothing running, if tshark cannot be started."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_previous_runs()
+        if not await self._spawn():
+            return False
+        self._watcher = asyncio.create_task(self._watch())
+        logger.info(f"Ring buffer capture started on {self.interface} in {self.directory}")
+        return True
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self.running:
+            self._process.terminate()
+            await self._process.wait()
+        if self._watcher is not None:
+            await self._watcher
+            self._watcher = None
+
+    async def _watch(self) -> None:
+        while True:
+            exited = not self.running
+            if self._scan(exited):
+                await self._notify()
+            if not exited:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if self._stopping.is_set():
+                return
+            if self._process is not None:
+                stderr = await self._process.stderr.read()
+                logger.error(f"Ring buffer capture on {self.interface} exited with code {self._process.returncode}, "
+                             f"restarting in {self.restart_delay}s: {stderr.decode(errors='replace').strip()}")
+                self._process = None
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.restart_delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            # tshark numbers the segments of every run from 1; keep sequence numbers increasing across runs.
+            self._seq_base = self._max_seq
+            if await self._spawn():
+                self.restarts += 1
+                logger.info(f"Ring buffer capture restarted on {self.interface}")
+
+    def _scan(self, exited: bool) -> bool:
+        """Index new segment files, mark the ones tshark has moved past as complete, and return whether anything changed."""
+        with self._lock:
+            changed, completed = self._index(exited)
+            if completed:
+                self._enforce_quota()
+        return changed or bool(completed)
+
+    def _index_previous_runs(self) -> None:
+        """Index ring files left by earlier runs as complete, in file time order, and number this run's segments after them."""
+        leftovers = []
+        for path in glob.glob(os.path.join(self.directory, "ring_*.pcap")):
+            match = _SEGMENT_NAME.search(path)
+            if match is not None and path not in self._known:
+                leftovers.append((match.group(2), int(match.group(1)), path))
+        if not leftovers:
+            return
+        with self._lock:
+            # Every run numbers its segments from 1, so order by the timestamp in the name, not the sequence number.
+            for stamp, _, path in sorted(leftovers):
+                self._max_seq += 1
+                segment = Segment(self._max_seq, path, _segment_start(stamp), end=os.path.getmtime(path),
+                                  size=os.path.getsize(path))
+                self._known[path] = segment
+                self.segments.append(segment)
+            self._seq_base = self._max_seq
+            self._enforce_quota()
+        logger.info(f"Indexed {len(leftovers)} ring buffer segments from earlier runs in {self.directory}")
+
+    def _index(self, exited: bool) -> tuple[bool, list]:
+        """Return whether new segments appeared and the segments that completed; the caller holds the lock."""
+        changed = exited
+        for path in sorted(glob.glob(os.path.join(self.directory, "ring_*.pcap"))):
+            match = _SEGMENT_NAME.search(path)
+            if match is None or path in self._known:
+                continue
+            segment = Segment(self._seq_base + int(match.group(1)), path, _segment_start(match.group(2)))
+            self._max_seq = max(self._max_seq, segment.seq)
+            self._known[path] = segment
+            self.segments.append(segment)
+            changed = True
+        self.segments.sort(key=lambda s: s.seq)
+        completed = []
+        for index, segment in enumerate(self.segments):
+            if segment.complete:
+                continue
+            if index + 1 < len(self.segments):
+                segment.end = self.segments[index + 1].start
+            elif exited:
+                segment.end = os.path.getmtime(segment.path) if os.path.exists(segment.path) else time.time()
+            else:
+                continue
+            segment.size = os.path.getsize(segment.path) if os.path.exists(segment.path) else 0
+            completed.append(segment)
+        return changed, completed
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _enforce_quota(self) -> None:
+        """Delete the oldest unleased completed segments until the directory fits the quota; the caller holds the lock."""
+        total = sum(s.size for s in self.segments if s.complete)
+        for segment in list(self.segments):
+            if total <= self.quota_bytes:
+                break
+            if not segment.complete or segment.leases:
+                continue
+            try:
+                os.remove(segment.path)
+            except FileNotFoundError:
+                pass
+            total -= segment.size
+            self.segments.remove(segment)
+            del self._known[segment.path]
+
+    def segments_between(self, start: float, end: float, previous_end: float = None) -> list:
+        """Return the indexed segments whose time range overlaps [start, end].
+
+        With `previous_end`, the end of the window before this one, only segments that start at
+        or after it are returned: the segment in which that window ended was already read by it.
+        """
+        return [s for s in self.segments if s.start <= end and (s.end is None or s.end >= start)
+                and (previous_end is None or s.start >= previous_end)]
+
+    def covers(self, end: float) -> bool:
+        """True once a completed segment reaches `end`."""
+        return any(s.complete and s.end >= end for s in self.segments)
+
+    async def wait_for_window(self, start: float, end: float, previous_end: float = None) -> list:
+        """Wait until every segment covering [start, end] is complete and return them.
+
+        Segments the previous window (ending at `previous_end`) already returned are left out,
+        unless that would leave nothing, as for a window shorter than one segment.
+        Raises CaptureUnavailableError if tshark is not running or exits before the window ends.
+        """
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self.running or self.covers(end))
+        segments = ([s for s in self.segments_between(start, end, previous_end) if s.complete]
+                    or [s for s in self.segments_between(start, end) if s.complete])
+        if not segments or not self.covers(end):
+            raise CaptureUnavailableError(f"Ring buffer capture on {self.interface} stopped before the window ended")
+        return segments
+
+    def lease(self, segments: list) -> None:
+        """Protect segments from quota eviction while they are being analyzed."""
+        with self._lock:
+            for segment in segments:
+                segment.leases += 1
+
+    def lease_window(self, start: float, end: float) -> list:
+        """Lease and return the completed segments overlapping [start, end], to analyze a past window again."""
+        with self._lock:
+            segments = [s for s in self.segments_between(start, end) if s.complete]
+            for segment in segments:
+                segment.leases += 1
+        return segments
+
+    def release(self, segments: list) -> None:
+        with self._lock:
+            for segment in segments:
+                segment.leases -= 1
+
+    def follow_window(self, start: float, end: float, previous_end: float = None) -> "SegmentFollower":
+        """Return a blocking pcap byte stream over [start, end] that follows segments as they are written."""
+        return SegmentFollower(self, start, end, previous_end)
+
+class SegmentFollower:
+    """File-like reader that concatenates ring buffer segments into one pcap stream while they grow.
+
+    The first segment's global header is passed through; the headers of later segments are
+    skipped so the stream stays a single valid pcap. Reading ends once a segment completes
+    at or after the window end; if the capture stops first, read() raises CaptureUnavailableError.
+    Segments are leased as the stream reaches them and released by close(). With `previous_end`
+    the stream starts after the segment in which the previous window ended, as in
+    CaptureManager.segments_between, so consecutive windows never read a segment twice.
+    """
+
+    def __init__(self, manager: CaptureManager, start: float, end: float, previous_end: float = None,
+                 poll_interval: float = STREAMING_POLL_INTERVAL):
+        self.name = f"{manager.directory} [{start:.0f}-{end:.0f}]"
+        self.manager = manager
+        self.start = start
+        self.end = end
+        self.previous_end = previous_end
+        self.poll_interval = poll_interval
+        self._segment = None
+        self._file = None
+        self._header_sent = False
+        self._leased = []
+
+    def _next_segment(self):
+        """Lease and return the next segment of the window, so quota eviction cannot delete it before it is read."""
+        with self.manager._lock:
+            for segment in self.manager.segments:
+                if self._segment is not None and segment.seq <= self._segment.seq:
+                    continue
+                if segment.end is not None and segment.end < self.start:
+                    continue
+                if self.previous_end is not None and segment.start < self.previous_end:
+                    continue
+                segment.leases += 1
+                self._leased.append(segment)
+                return segment
+        return None
+
+    def _finished(self) -> bool:
+        if self._segment is not None and self._segment.complete and self._segment.end >= self.end:
+            return True
+        self._check_running()
+        return False
+
+    def _check_running(self) -> None:
+        if not self.manager.running:
+            raise CaptureUnavailableError(f"Ring buffer capture on {self.manager.interface} stopped before the window ended")
+
+    def read(self, size: int = -1) -> bytes:
+        buf = b""
+        while size < 0 or len(buf) < size:
+            if self._file is None:
+                segment = self._next_segment()
+                if segment is None:
+                    if self._finished():
+                        return buf
+                    time.sleep(self.poll_interval)
+                    continue
+                self._segment = segment
+                self._file = open(segment.path, "rb")
+                if self._header_sent:
+                    self._file.read(24)
+                self._header_sent = True
+            chunk = self._file.read(-1 if size < 0 else size - len(buf))
+            if chunk:
+                buf += chunk
+                continue
+            if self._segment.complete:
+                # Whatever is left was flushed before tshark moved on to the next file.
+                buf += self._file.read(-1 if size < 0 else size - len(buf))
+                self._file.close()
+                self._file = None
+                if self._finished():
+                    return buf
+                continue
+            self._check_running()
+            time.sleep(self.poll_interval)
+        return buf
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.manager.release(self._leased)
+        self._leased = []
@@ -19,4 +19,18 @@ class MyDeps:
     duration: int = Field(default=5, description="Duration of data collection in seconds")
     cycle_interval: int = Field(default=2, description="Interval between monitoring cycles")
     avg_latency: float = Field(default=None, description="Average network latency")
-    avg_loss: float = Field(default=None, description="Average packet loss")
\ No newline at end of file
+    avg_loss: float = Field(default=None, description="Average packet loss")
+    detection_output: Optional[str] = Field(default=None, description="Precomputed attack detection output for the capture")
+
+class LinkConfig(BaseModel):
+    interface: str = Field(description="Interface to capture on and measure throughput of")
+    target: str = Field(description="External host probed for latency and loss")
+    gateway: Optional[str] = Field(default=None, description="Local host probed alongside the target; None uses the interface's default gateway")
+
+    @property
+    def link_id(self) -> str:
+        return f"{self.interface}/{self.target}"
+
+    @property
+    def labels(self) -> dict:
+        return {"link": self.link_id, "interface": self.interface, "target": self.target}
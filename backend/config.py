@@ -1,13 +1,14 @@
 import os
 import asyncio
 from common_classes import MyDeps
-from tools.data_collection import INTERFACE
 
 # Environment configuration
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Network interface for capture
+INTERFACE = os.environ.get("CAPTURE_INTERFACE", "Wi-Fi")
+
 # Global variables
-connected_clients = set()
 metrics_queue = asyncio.Queue()
 attack_queue = asyncio.Queue()
 
@@ -17,4 +18,99 @@ DEFAULT_DEPS = MyDeps(
     duration=18,
     cycle_interval=1
 )
-SLIDING_WINDOW_MAXLEN = 15
\ No newline at end of file
+SLIDING_WINDOW_MAXLEN = 15
+SLIDING_WINDOW_PERCENTILES = (50, 95, 99)  # Latency/loss percentiles added to each aggregates payload
+
+# Attack classifier configuration
+CLASSIFIER_MODEL_NAME = os.environ.get("CLASSIFIER_MODEL", "rdpahalavan/bert-network-packet-flow-header-payload")
+CLASSIFIER_BATCH_SIZE = 64
+CLASSIFIER_NUM_THREADS = None  # None keeps torch's default intra-op thread count
+CLASSIFIER_BACKEND = os.environ.get("CLASSIFIER_BACKEND", "eager")  # "eager" (PyTorch), "quantized" (PyTorch dynamic int8), "onnx" or "onnx_int8" (need onnxruntime and onnx)
+CLASSIFIER_ONNX_DIR = os.environ.get("CLASSIFIER_ONNX_DIR", "data/onnx")  # Where ONNX exports are written on first load and reused
+FLOW_SAMPLE_BUDGET = 32  # Max packets classified per 5-tuple flow; 0 classifies every packet
+VERDICT_CACHE_SIZE = 100_000  # Feature strings whose predicted class is remembered across captures
+FAST_PCAP_PARSER = True  # Read IPv4/TCP fields straight from pcap records instead of dissecting with scapy
+
+# Inference worker pool configuration
+INFERENCE_WORKERS = 0  # Worker processes for packet classification; 0 classifies in a thread of this process
+INFERENCE_THREADS_PER_WORKER = 1  # torch intra-op threads in each worker
+INFERENCE_CHUNK_SIZE = 256  # Feature strings sent to a worker per task
+INFERENCE_MAX_PENDING_CHUNKS = None  # Chunks in flight before new work queues; None means 2 per worker
+
+# Streaming analysis configuration
+STREAMING_ANALYSIS = False  # Classify packets while they are captured instead of after
+STREAMING_SOURCE = "pipe"  # "pipe" reads tshark's stdout, "file" follows the growing capture file
+STREAMING_FLUSH_INTERVAL = 0.5  # Max seconds before a partial batch is classified
+STREAMING_POLL_INTERVAL = 0.05  # Seconds between reads of a growing capture file
+STREAMING_MAX_PENDING_CHUNKS = 16
+
+# Security verdict configuration
+VERDICT_FAST_PATH = True  # Decide clear-cut verdicts locally and only ask the LLM about ambiguous ones
+VERDICT_LLM_DETAILS = False  # Also ask the LLM for a human-readable summary of fast-path verdicts, off the critical path
+VERDICT_ATTACK_RATIO = 0.5  # Attack when Normal packets <= this times the severity-weighted attack packets
+VERDICT_NORMAL_RATIO = 2.0  # Clean when Normal packets >= this times the severity-weighted attack packets
+VERDICT_MIN_PACKETS = 20  # Captures with fewer TCP packets and any attack traffic are left to the LLM
+CLASS_SEVERITY = {  # Weight of each attack class against Normal traffic; unlisted classes weigh 1.0
+    'Analysis': 0.5, 'Generic': 0.5, 'Fuzzers': 0.75, 'Reconnaissance': 0.75, 'Port Scan': 0.75,
+    'Backdoor': 2.0, 'Heartbleed': 2.0, 'Infiltration': 2.0, 'Shellcode': 2.0, 'Worms': 2.0,
+    'Web Attack - SQL Injection': 1.5, 'Exploits': 1.5,
+}
+
+# Parameter tuning configuration
+TUNING_MODE = "local"  # "local" uses the heuristic tuner, "llm" asks the parameter tuning agent every time
+TUNING_LLM_ADVISOR = False  # In local mode, also ask the LLM in the background and memoize its answer for next time
+TUNING_LATENCY_BUCKET_MS = 10
+TUNING_LOSS_BUCKET_PCT = 1
+TUNING_LATENCY_THRESHOLD_MS = 75
+TUNING_LOSS_THRESHOLD_PCT = 5
+TUNING_DURATION_RANGE = (30, 100)  # Capture duration bounds in seconds
+TUNING_INTERVAL_RANGE = (5, 30)  # Cycle interval bounds in seconds
+
+# Ping configuration
+PING_INTERVAL = 0.2  # Seconds between the echo requests of one ping
+PING_TCP_FALLBACK_PORT = 443  # Port timed with TCP connects when ICMP sockets are not permitted
+
+# Ring buffer capture configuration
+CAPTURE_RING_BUFFER = True  # Keep one tshark running and analyze completed segments instead of capturing per cycle
+CAPTURE_DIR = "lastCapture/ring"
+CAPTURE_SEGMENT_SECONDS = 5  # Rotate to a new segment after this many seconds...
+CAPTURE_SEGMENT_KB = 51200  # ...or this many kilobytes, whichever comes first
+CAPTURE_DISK_QUOTA_MB = 2048  # Oldest segments are deleted once completed segments exceed this
+CAPTURE_POLL_INTERVAL = 0.5  # Seconds between scans of the ring buffer directory
+CAPTURE_RESTART_DELAY = 5  # Seconds before restarting a ring buffer tshark that exited
+
+# WebSocket broadcast configuration
+WS_CLIENT_QUEUE_SIZE = 32  # Messages queued per client before the oldest are dropped
+WS_SEND_TIMEOUT = 5.0  # Seconds a single send may take before the client is disconnected
+
+# Metrics history configuration
+METRICS_STORE = True  # Persist metrics and verdicts for the history endpoints
+METRICS_DB_PATH = "data/metrics.db"
+METRICS_FLUSH_INTERVAL = 1.0  # Seconds between batched writes
+METRICS_ROLLUP_RESOLUTIONS = (1, 60, 3600)  # Rollup bucket sizes in seconds
+METRICS_RETENTION_SECONDS = {0: 86400, 1: 86400, 60: 30 * 86400, 3600: 365 * 86400}  # Keyed by resolution, 0 is raw samples
+METRICS_VERDICT_RETENTION_SECONDS = 365 * 86400
+METRICS_QUERY_MAX_POINTS = 1000  # Queries pick the finest resolution that returns at most this many points per field
+
+# Monitoring scheduler configuration
+MONITOR_CONFIG_PATH = os.environ.get("MONITOR_CONFIG", "monitor_targets.json")  # Interfaces and targets; see monitor_targets.example.json
+MONITOR_DEFAULT_TARGET = "8.8.8.8"  # Probed on INTERFACE when no config file exists
+METRIC_COLLECTION_INTERVAL = 2  # Seconds between metric collections for each link
+SCHEDULER_SHARDS = 4  # Tasks that share the work of scheduling collections
+SCHEDULER_MAX_CONCURRENCY = 64  # Collections in flight at once across all links
+
+# Anomaly cycle configuration
+CYCLE_MAX_IN_FLIGHT = 2  # Anomaly cycles per link that may run at once; the next capture can start while earlier ones are analyzed
+CYCLE_TUNING_TIMEOUT = 30  # Seconds to wait for capture parameters before keeping the current ones
+CYCLE_CAPTURE_GRACE = 15  # Seconds a capture may run past its duration before it is cancelled
+CYCLE_ANALYSIS_TIMEOUT = 120  # Seconds an analysis may take after its capture is handed over; later verdicts are dropped
+
+# Instrumentation configuration
+TRACE_SAMPLE_RATE = 0.0  # Fraction of anomaly cycles recorded as traces; 0 disables tracing
+TRACE_BUFFER_SIZE = 1000  # Most recent sampled spans kept for the /traces endpoint
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Histogram bounds in seconds
+
+# Startup configuration
+CLASSIFIER_WARM_UP = True  # Load the classifier in the background at startup instead of on the first anomaly
+CLASSIFIER_WARM_UP_DELAY = 1.0  # Seconds after startup before the warm-up begins
+CLASSIFIER_TORCHSCRIPT_PATH = os.environ.get("CLASSIFIER_TORCHSCRIPT")  # If set, the eager backend loads this TorchScript file (created from the model on first run)
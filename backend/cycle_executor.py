@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import time
+import logging
+from collections import deque
+from config import CYCLE_MAX_IN_FLIGHT
+from instrumentation import trace, STAGE_SECONDS, CYCLES
+
+logger = logging.getLogger(__name__)
+
+class ReplyRouter:
+    """Hands replies tagged with a "cycle_id" from an agent queue to the cycle waiting for them.
+
+    A reply nobody is waiting for any more (its cycle timed out or was cancelled) is stale
+    and dropped, so it can never be mistaken for the answer to a later cycle.
+    """
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.stale = 0
+        self._waiting = {}
+        self._task = None
+
+    def expect(self, cycle_id: int) -> asyncio.Future:
+        """Register interest in the reply for `cycle_id`; call before sending the request."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[cycle_id] = future
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._route())
+        return future
+
+    def forget(self, cycle_id: int) -> None:
+        self._waiting.pop(cycle_id, None)
+
+    async def _route(self) -> None:
+        while True:
+            reply = await self.queue.get()
+            future = self._waiting.pop(reply["cycle_id"], None)
+            if future is None or future.done():
+                self.stale += 1
+                logger.info(f"Dropped stale reply for cycle {reply['cycle_id']}")
+                continue
+            future.set_result(reply)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+class CycleExecutor:
+    """Runs a link's anomaly cycles as tasks so monitoring never waits on an analysis.
+
+    At most `max_in_flight` cycles run at once and only one of them may be tuning or
+    capturing, so the capture for cycle N+1 can start while cycle N is still being
+    analyzed. Each cycle returns its outcome ("attack", "clean", "stale", "timeout" or
+    "error"); completions feed a cycles-per-minute rate over the last `rate_window` seconds.
+    """
+
+    def __init__(self, name: str, max_in_flight: int = CYCLE_MAX_IN_FLIGHT, rate_window: float = 60.0):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_window = rate_window
+        self.capturing_cycle = None
+        self.started = 0
+        self.outcomes = {}
+        self._ids = itertools.count(1)
+        self._tasks = set()
+        self._completed_at = deque()
+        self._first_start = None
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def can_start(self) -> bool:
+        return self.capturing_cycle is None and len(self._tasks) < self.max_in_flight
+
+    def capture_done(self, cycle_id: int) -> None:
+        """Let the next cycle start capturing once this one's capture has finished (or failed)."""
+        if self.capturing_cycle == cycle_id:
+            self.capturing_cycle = None
+
+    def start(self, run_cycle) -> int:
+        """Run `run_cycle(cycle_id)` in the background and return the new cycle's id."""
+        cycle_id = self.next_id()
+        # Claimed here rather than inside the task so a second check in the same tick cannot start another capture.
+        self.capturing_cycle = cycle_id
+        task = asyncio.create_task(self._run(cycle_id, run_cycle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return cycle_id
+
+    async def _run(self, cycle_id: int, run_cycle) -> None:
+        if self._first_start is None:
+            self._first_start = time.monotonic()
+        self.started += 1
+        outcome = "error"
+        try:
+            with trace("cycle", link=self.name, cycle_id=cycle_id), STAGE_SECONDS.time(stage="cycle"):
+                outcome = await run_cycle(cycle_id)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Cycle {cycle_id} on {self.name} failed: {e}")
+        finally:
+            self.capture_done(cycle_id)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self._completed_at.append(time.monotonic())
+            CYCLES.inc(outcome=outcome)
+
+    def cycles_per_minute(self) -> float:
+        """Completed cycles per minute over the rate window (or since the first cycle, if more recent)."""
+        now = time.monotonic()
+        while self._completed_at and self._completed_at[0] < now - self.rate_window:
+            self._completed_at.popleft()
+        if self._first_start is None:
+            return 0.0
+        elapsed = min(self.rate_window, now - self._first_start)
+        return len(self._completed_at) * 60 / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "cycles_started": self.started,
+            "cycles_in_flight": self.in_flight,
+            "cycles_per_minute": self.cycles_per_minute(),
+            **{f"cycles_{outcome}": count for outcome, count in self.outcomes.items()},
+        }
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
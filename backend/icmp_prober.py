@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+import os
+import socket
+import struct
+import time
+import logging
+from config import PING_INTERVAL, PING_TCP_FALLBACK_PORT
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+_PAYLOAD = b"network-monitor".ljust(56, b"\x00")
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class IcmpProber:
+    """In-process async ping that multiplexes echo requests for every target over one socket.
+
+    Uses an unprivileged ICMP datagram socket where the kernel allows it, a raw socket when
+    running with privileges, and otherwise times TCP connects to PING_TCP_FALLBACK_PORT.
+    Replies are matched to outstanding probes by (address, sequence number).
+    """
+
+    def __init__(self, tcp_port: int = PING_TCP_FALLBACK_PORT):
+        self.tcp_port = tcp_port
+        self.mode = None
+        self._sock = None
+        self._loop = None
+        self._ident = os.getpid() & 0xFFFF
+        self._sequence = itertools.count()
+        self._waiters = {}
+        self._addresses = {}
+
+    def _open(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for mode, kind in (("dgram", socket.SOCK_DGRAM), ("raw", socket.SOCK_RAW)):
+            try:
+                sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except OSError:
+                continue
+            sock.setblocking(False)
+            try:
+                self._loop.add_reader(sock.fileno(), self._on_readable)
+            except NotImplementedError:
+                # Windows' proactor event loop cannot watch sockets for readability.
+                sock.close()
+                break
+            self._sock = sock
+            self.mode = mode
+            return
+        self.mode = "tcp"
+        logger.info(f"ICMP sockets unavailable; probing with TCP connects to port {self.tcp_port}.")
+
+    def _on_readable(self) -> None:
+        received = time.perf_counter()
+        while True:
+            try:
+                packet, (address, _) = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.error(f"ICMP receive error: {e}")
+                return
+            # Raw sockets, and datagram sockets on macOS, deliver the IPv4 header too; ICMP types never start with 4.
+            if packet and packet[0] >> 4 == 4:
+                packet = packet[(packet[0] & 0x0F) * 4:]
+            if len(packet) < 8:
+                continue
+            icmp_type, _, _, ident, sequence = struct.unpack("!BBHHH", packet[:8])
+            # Datagram sockets get their identifier rewritten by the kernel, raw sockets see everything.
+            if icmp_type != ICMP_ECHO_REPLY or (self.mode == "raw" and ident != self._ident):
+                continue
+            waiter = self._waiters.pop((address, sequence), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(received)
+
+    async def _resolve(self, host: str) -> str:
+        address = self._addresses.get(host)
+        if address is None:
+            infos = await self._loop.getaddrinfo(host, None, family=socket.AF_INET)
+            address = self._addresses[host] = infos[0][4][0]
+        return address
+
+    async def _icmp_probe(self, address: str, timeout: float):
+        sequence = next(self._sequence) & 0xFFFF
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, sequence)
+        packet = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + _PAYLOAD), self._ident, sequence) + _PAYLOAD
+        waiter = self._loop.create_future()
+        self._waiters[(address, sequence)] = waiter
+        try:
+            sent = time.perf_counter()
+            self._sock.sendto(packet, (address, 0))
+            received = await asyncio.wait_for(waiter, timeout)
+            return (received - sent) * 1000
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._waiters.pop((address, sequence), None)
+
+    async def _tcp_probe(self, address: str, timeout: float):
+        sent = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, self.tcp_port), timeout)
+        except ConnectionRefusedError:
+            # A reset still proves the host answered.
+            return (time.perf_counter() - sent) * 1000
+        except (asyncio.TimeoutError, OSError):
+            return None
+        rtt = (time.perf_counter() - sent) * 1000
+        writer.close()
+        return rtt
+
+    async def probe(self, host: str, timeout: float = 2):
+        """Send one probe and return its round-trip time in ms, or None if it was lost."""
+        if self.mode is None:
+            self._open()
+        address = await self._resolve(host)
+        if self.mode == "tcp":
+            return await self._tcp_probe(address, timeout)
+        return await self._icmp_probe(address, timeout)
+
+    async def ping(self, host: str, count: int = 4, timeout: float = 2, interval: float = PING_INTERVAL) -> dict:
+        """Send `count` probes `interval` seconds apart and summarize loss and average latency."""
+        async def delayed_probe(delay):
+            await asyncio.sleep(delay)
+            return await self.probe(host, timeout)
+
+        try:
+            rtts = await asyncio.gather(*(delayed_probe(i * interval) for i in range(count)))
+        except OSError as e:
+            logger.error(f"Ping to {host} failed: {e}")
+            return {"packet_loss": None, "avg_latency": None}
+        replies = [rtt for rtt in rtts if rtt is not None]
+        return {
+            "packet_loss": 100.0 * (count - len(replies)) / count,
+            "avg_latency": sum(replies) / len(replies) if replies else None,
+        }
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        self.mode = None
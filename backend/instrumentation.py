@@ -0,0 +1,209 @@
+import bisect
+import contextvars
+import itertools
+import random
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from config import TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set, safe to observe from worker threads."""
+
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the enclosed block, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(values.items()))
+        return lines
+
+class Registry:
+    """Holds the process's instruments and renders them in the Prometheus text format.
+
+    Besides histograms and counters, collectors can be registered: callables returning a
+    stats dict (or a dict of label value to stats dict) that are read at scrape time and
+    exported as gauges, so existing stats() methods need no changes to be scraped.
+    """
+
+    def __init__(self, prefix: str = "netmon"):
+        self.prefix = prefix
+        self._instruments = {}
+        self._collectors = {}
+
+    def histogram(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        name = f"{self.prefix}_{name}"
+        if name not in self._instruments:
+            self._instruments[name] = Histogram(name, help, buckets)
+        return self._instruments[name]
+
+    def counter(self, name: str, help: str) -> Counter:
+        name = f"{self.prefix}_{name}"
+        if name not in self._instruments:
+            self._instruments[name] = Counter(name, help)
+        return self._instruments[name]
+
+    def register_collector(self, name: str, collect, label: str = None) -> None:
+        """Export the numeric values of collect() as gauges named <prefix>_<name>_<key>.
+
+        With `label`, collect() returns {label value: stats dict} and each value becomes a label.
+        """
+        self._collectors[name] = (collect, label)
+
+    def _render_collector(self, name: str, collect, label: str) -> list:
+        try:
+            collected = collect()
+        except Exception as e:
+            logger.error(f"Metrics collector {name} failed: {e}")
+            return []
+        groups = collected.items() if label else [(None, collected)]
+        gauges = {}
+        for label_value, stats in groups:
+            for key, value in (stats or {}).items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    labels = ((label, label_value),) if label else ()
+                    gauges.setdefault(f"{self.prefix}_{name}_{key}", []).append((labels, value))
+        lines = []
+        for gauge, samples in sorted(gauges.items()):
+            lines.append(f"# TYPE {gauge} gauge")
+            lines.extend(f"{gauge}{_format_labels(labels)} {value}" for labels, value in samples)
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self._instruments.values():
+            lines.extend(instrument.render())
+        for name, (collect, label) in self._collectors.items():
+            lines.extend(self._render_collector(name, collect, label))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Shared instruments; stages are labels rather than separate metrics so dashboards can stack them.
+STAGE_SECONDS = REGISTRY.histogram("stage_seconds", "Wall time of monitoring pipeline stages")
+PING_SECONDS = REGISTRY.histogram("ping_seconds", "Wall time of one ping measurement (all probes)")
+BROADCAST_SEND_SECONDS = REGISTRY.histogram("broadcast_send_seconds", "Time to send one WebSocket message to one client")
+CYCLES = REGISTRY.counter("cycles_total", "Anomaly cycles by outcome")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "duration")
+
+    def __init__(self, trace_id: int, parent_id, name: str, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+
+    def as_dict(self) -> dict:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start": self.start, "duration": self.duration, "attributes": self.attributes}
+
+@contextmanager
+def trace(name: str, sample_rate: float = None, **attributes):
+    """Record a span when tracing is sampled in; nested calls join the enclosing trace.
+
+    The sampling decision is made once at the root span, so unsampled work costs one
+    context variable lookup and a random draw per root.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        if rate <= 0 or random.random() >= rate:
+            yield None
+            return
+        span = Span(next(_span_ids), None, name, attributes)
+    else:
+        span = Span(parent.trace_id, parent.span_id, name, attributes)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        _traces.append(span)
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Time a pipeline stage into STAGE_SECONDS and, if the surrounding trace is sampled, record a span."""
+    with trace(name, **attributes) if _current_span.get() is not None else _no_span():
+        with STAGE_SECONDS.time(stage=name):
+            yield
+
+@contextmanager
+def _no_span():
+    yield None
+
+def recent_spans(limit: int = 200) -> list:
+    """The most recently finished sampled spans, newest first."""
+    return [span.as_dict() for span in itertools.islice(reversed(_traces), limit)]
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from config import (METRICS_DB_PATH, METRICS_FLUSH_INTERVAL, METRICS_ROLLUP_RESOLUTIONS, METRICS_RETENTION_SECONDS,
+                    METRICS_VERDICT_RETENTION_SECONDS, METRICS_QUERY_MAX_POINTS)
+
+logger = logging.getLogger(__name__)
+
+RAW = 0  # Resolution key of the unaggregated samples
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    link TEXT NOT NULL,
+    field TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_link_field_ts ON samples (link, field, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    link TEXT NOT NULL,
+    field TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (resolution, link, field, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS verdicts (
+    link TEXT NOT NULL,
+    ts REAL NOT NULL,
+    attack_detected INTEGER NOT NULL,
+    details TEXT,
+    counts TEXT
+);
+CREATE INDEX IF NOT EXISTS verdicts_link_ts ON verdicts (link, ts);
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO rollups (resolution, link, field, bucket, count, sum, min, max) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, link, field, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    sum = sum + excluded.sum,
+    min = min(min, excluded.min),
+    max = max(max, excluded.max)
+"""
+
+def flatten_metrics(data_point: dict) -> dict:
+    """Pick the numeric series worth keeping out of a collect_metrics data point."""
+    values = {
+        "throughput_sent": data_point.get("throughput_sent"),
+        "throughput_recv": data_point.get("throughput_recv"),
+    }
+    for name in ("external_ping", "local_ping"):
+        ping = data_point.get(name) or {}
+        prefix = name.replace("_ping", "")
+        values[f"{prefix}_latency"] = ping.get("avg_latency")
+        values[f"{prefix}_loss"] = ping.get("packet_loss")
+    for key, value in (data_point.get("aggregates") or {}).items():
+        values[f"window_{key}"] = value
+    return {field: float(value) for field, value in values.items() if isinstance(value, (int, float))}
+
+class MetricsStore:
+    """Append-only SQLite (WAL) store for metric samples and attack verdicts.
+
+    Every row is tagged with the monitored link it came from. Samples are buffered in memory and written in one transaction per flush; the same flush
+    folds them into count/sum/min/max rollups at each of METRICS_ROLLUP_RESOLUTIONS, so range
+    queries over long spans read a few hundred precomputed buckets instead of raw samples.
+    """
+
+    def __init__(self, path: str = METRICS_DB_PATH, flush_interval: float = METRICS_FLUSH_INTERVAL,
+                 resolutions: tuple = METRICS_ROLLUP_RESOLUTIONS, retention: dict = METRICS_RETENTION_SECONDS,
+                 verdict_retention: float = METRICS_VERDICT_RETENTION_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.resolutions = tuple(sorted(resolutions))
+        self.retention = retention
+        self.verdict_retention = verdict_retention
+        self.rows_written = 0
+        self.flushes = 0
+        self._samples = []
+        self._verdicts = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_prune = 0.0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record_metrics(self, data_point: dict, ts: float = None, link: str = "") -> None:
+        """Buffer the numeric fields of a data point for the next flush."""
+        ts = time.time() if ts is None else ts
+        samples = [(link, field, ts, value) for field, value in flatten_metrics(data_point).items()]
+        with self._lock:
+            self._samples.extend(samples)
+
+    def record_verdict(self, attack_detected: bool, details: str = None, counts: dict = None, ts: float = None,
+                       link: str = "") -> None:
+        ts = time.time() if ts is None else ts
+        verdict = (link, ts, int(attack_detected), details, json.dumps(counts) if counts is not None else None)
+        with self._lock:
+            self._verdicts.append(verdict)
+
+    def _rollups(self, samples: list) -> list:
+        buckets = {}
+        for link, field, ts, value in samples:
+            for resolution in self.resolutions:
+                key = (resolution, link, field, int(ts // resolution) * resolution)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [1, value, value, value]
+                else:
+                    bucket[0] += 1
+                    bucket[1] += value
+                    bucket[2] = min(bucket[2], value)
+                    bucket[3] = max(bucket[3], value)
+        return [(*key, *bucket) for key, bucket in buckets.items()]
+
+    def flush(self) -> int:
+        """Write buffered samples, rollups and verdicts in one transaction; returns rows written."""
+        with self._lock:
+            samples, self._samples = self._samples, []
+            verdicts, self._verdicts = self._verdicts, []
+        if not samples and not verdicts:
+            return 0
+        with self._write_lock:
+            rollups = self._rollups(samples)
+            with self._writer:
+                self._writer.executemany("INSERT INTO samples (link, field, ts, value) VALUES (?, ?, ?, ?)", samples)
+                self._writer.executemany(_UPSERT_ROLLUP, rollups)
+                self._writer.executemany(
+                    "INSERT INTO verdicts (link, ts, attack_detected, details, counts) VALUES (?, ?, ?, ?, ?)", verdicts
+                )
+            written = len(samples) + len(rollups) + len(verdicts)
+            self.rows_written += written
+            self.flushes += 1
+            if time.time() - self._last_prune >= min(self.retention.values()) / 24:
+                self._prune()
+            return written
+
+    def _prune(self) -> None:
+        """Drop samples, rollups and verdicts older than their retention."""
+        now = time.time()
+        self._last_prune = now
+        with self._writer:
+            if RAW in self.retention:
+                self._writer.execute("DELETE FROM samples WHERE ts < ?", (now - self.retention[RAW],))
+            self._writer.execute("DELETE FROM verdicts WHERE ts < ?", (now - self.verdict_retention,))
+            for resolution in self.resolutions:
+                if resolution in self.retention:
+                    self._writer.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                                         (resolution, now - self.retention[resolution]))
+
+    async def run(self) -> None:
+        """Flush buffered rows every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Error writing metrics: {e}")
+
+    def pick_resolution(self, start: float, end: float, max_points: int = METRICS_QUERY_MAX_POINTS) -> int:
+        """Finest rollup resolution that covers [start, end] in at most max_points buckets."""
+        for resolution in self.resolutions:
+            if (end - start) / resolution <= max_points:
+                return resolution
+        return self.resolutions[-1]
+
+    def query(self, fields: list, start: float, end: float, resolution: int = None,
+              max_points: int = METRICS_QUERY_MAX_POINTS, link: str = "") -> dict:
+        """Return per-field points over [start, end]; resolution RAW returns the stored samples."""
+        if resolution is None:
+            resolution = self.pick_resolution(start, end, max_points)
+        conn = self._connect()
+        try:
+            series = {}
+            for field in fields:
+                if resolution == RAW:
+                    rows = conn.execute(
+                        "SELECT ts, value FROM samples WHERE link = ? AND field = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                        (link, field, start, end)
+                    ).fetchall()
+                    series[field] = [{"t": ts, "value": value} for ts, value in rows]
+                else:
+                    rows = conn.execute(
+                        "SELECT bucket, count, sum, min, max FROM rollups "
+                        "WHERE resolution = ? AND link = ? AND field = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+                        (resolution, link, field, int(start // resolution) * resolution, end)
+                    ).fetchall()
+                    series[field] = [{"t": bucket, "avg": total / count, "min": low, "max": high, "count": count}
+                                     for bucket, count, total, low, high in rows]
+        finally:
+            conn.close()
+        return {"link": link, "start": start, "end": end, "resolution": resolution, "series": series}
+
+    def verdicts(self, start: float, end: float, limit: int = 1000, link: str = None) -> list:
+        """Verdicts over [start, end], newest first, for one link or all of them."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT link, ts, attack_detected, details, counts FROM verdicts "
+                "WHERE ts BETWEEN ? AND ? AND (? IS NULL OR link = ?) ORDER BY ts DESC LIMIT ?",
+                (start, end, link, link, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{"link": row_link, "t": ts, "attack_detected": bool(attack), "details": details,
+                 "counts": json.loads(counts) if counts else None} for row_link, ts, attack, details, counts in rows]
+
+    def fields(self) -> dict:
+        """Stored metric names per link."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT link, field FROM rollups WHERE resolution = ?", (self.resolutions[-1],)
+            ).fetchall()
+        finally:
+            conn.close()
+        fields = {}
+        for link, field in sorted(rows):
+            fields.setdefault(link, []).append(field)
+        return fields
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._samples) + len(self._verdicts), "rows_written": self.rows_written, "flushes": self.flushes}
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            self._writer.close()
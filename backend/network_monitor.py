@@ -1,46 +1,73 @@
-from collections import deque
 import asyncio
 import subprocess
+import os
 import psutil
 import time
-from agents.agent_monitoring import monitoring_agent
-from agents.agent_parameter_tuning import parameter_tuning_agent
-from common_classes import MyDeps, AnalysisResult
-from config import metrics_queue, attack_queue, SLIDING_WINDOW_MAXLEN
+from common_classes import MyDeps, AnalysisResult, ParameterResult, LinkConfig
+from config import (metrics_queue, attack_queue, INTERFACE, SLIDING_WINDOW_MAXLEN, SLIDING_WINDOW_PERCENTILES,
+                    STREAMING_ANALYSIS, STREAMING_SOURCE, VERDICT_FAST_PATH, VERDICT_LLM_DETAILS, TUNING_MODE,
+                    TUNING_LLM_ADVISOR, MONITOR_DEFAULT_TARGET, METRIC_COLLECTION_INTERVAL, CYCLE_TUNING_TIMEOUT,
+                    CYCLE_CAPTURE_GRACE, CYCLE_ANALYSIS_TIMEOUT)
+from tools.attack_detection import get_classifier
+from tools.inference_pool import classify_capture_async
+from tools.packet_stream import CaptureStream, stream_classify
+from tools.tuning_engine import HeuristicTuner
+from tools.verdict_engine import VerdictEngine
+from capture_manager import CaptureManager
+from cycle_executor import CycleExecutor, ReplyRouter
+from metrics_store import MetricsStore
+from sliding_window import SlidingWindow
+from instrumentation import stage
 from utils import get_ping_metrics, get_default_gateway
 import logging
 
 logger = logging.getLogger(__name__)
 
-INTERFACE = "Wi-Fi"  # Network interface for capture
-
 class PerformanceMonitoringAgent:
     def __init__(self, metrics_queue: asyncio.Queue, performance_to_tuning_queue: asyncio.Queue,
                  tuning_to_performance_queue: asyncio.Queue, performance_to_security_queue: asyncio.Queue,
-                 security_to_performance_queue: asyncio.Queue):
+                 security_to_performance_queue: asyncio.Queue, capture_manager: CaptureManager = None,
+                 metrics_store: MetricsStore = None, link: LinkConfig = None,
+                 capture_path: str = "lastCapture/capture.pcap"):
         self.metrics_queue = metrics_queue
         self.performance_to_tuning_queue = performance_to_tuning_queue
         self.tuning_to_performance_queue = tuning_to_performance_queue
         self.performance_to_security_queue = performance_to_security_queue
         self.security_to_performance_queue = security_to_performance_queue
-        self.sliding_window = deque(maxlen=SLIDING_WINDOW_MAXLEN)
-        self.deps = MyDeps(pathToFile="lastCapture/capture.pcap", duration=18, cycle_interval=1)
+        self.capture_manager = capture_manager
+        self.metrics_store = metrics_store
+        self.link = link or LinkConfig(interface=INTERFACE, target=MONITOR_DEFAULT_TARGET)
+        self.sliding_window = SlidingWindow(SLIDING_WINDOW_MAXLEN, ("latency", "loss"), SLIDING_WINDOW_PERCENTILES)
+        self.deps = MyDeps(pathToFile=capture_path, duration=18, cycle_interval=1)
         self.previous_attack_detected = False
         self.last_check_time = time.time()
+        self.executor = CycleExecutor(self.link.link_id)
+        self.tuning_replies = ReplyRouter(tuning_to_performance_queue)
+        self.analysis_replies = ReplyRouter(security_to_performance_queue)
+        self._free_capture_paths = []
+        self._capture_paths = 0
+        self._previous_window_end = None
 
     async def collect_metrics(self) -> None:
         """Collect network metrics and update the sliding window."""
-        io_old = psutil.net_io_counters()
-        router_ip = get_default_gateway() or "192.168.1.1"
+        with stage("collect_metrics"):
+            await self._collect_metrics()
+
+    async def _collect_metrics(self) -> None:
+        io_old = self._io_counters()
+        router_ip = self.link.gateway or get_default_gateway(self.link.interface) or get_default_gateway() or "192.168.1.1"
         await asyncio.sleep(0.1)
-        io_new = psutil.net_io_counters()
+        io_new = self._io_counters()
         bytes_sent = io_new.bytes_sent - io_old.bytes_sent
         bytes_recv = io_new.bytes_recv - io_old.bytes_recv
         throughput_sent = bytes_sent / 2
         throughput_recv = bytes_recv / 2
-        external_ping = await get_ping_metrics("8.8.8.8")
-        local_ping = await get_ping_metrics(router_ip)
+        external_ping, local_ping = await asyncio.gather(
+            get_ping_metrics(self.link.target),
+            get_ping_metrics(router_ip)
+        )
         data_point = {
+            **self.link.labels,
             "timestamp": time.ctime(),
             "bytes_sent": bytes_sent,
             "bytes_recv": bytes_recv,
@@ -49,76 +76,222 @@ class PerformanceMonitoringAgent:
             "external_ping": external_ping,
             "local_ping": local_ping
         }
-        self.sliding_window.append(data_point)
-
-        if self.sliding_window:
-            latencies = [dp["external_ping"]["avg_latency"] for dp in self.sliding_window if dp["external_ping"]["avg_latency"] is not None]
-            losses = [dp["external_ping"]["packet_loss"] for dp in self.sliding_window if dp["external_ping"]["packet_loss"] is not None]
-            aggregates = {
-                "avg_latency": sum(latencies) / len(latencies) if latencies else None,
-                "avg_loss": sum(losses) / len(losses) if losses else None,
-                "max_latency": max(latencies) if latencies else None,
-                "max_loss": max(losses) if losses else None
-            }
-            data_point["aggregates"] = aggregates
+        self.sliding_window.append(
+            data_point,
+            latency=external_ping["avg_latency"],
+            loss=external_ping["packet_loss"]
+        )
+        data_point["aggregates"] = self.sliding_window.aggregates()
+        if self.metrics_store is not None:
+            self.metrics_store.record_metrics(data_point, link=self.link.link_id)
         await self.metrics_queue.put(data_point)
 
+    def _io_counters(self):
+        """Counters of the monitored interface, or of all interfaces if it is not present."""
+        return psutil.net_io_counters(pernic=True).get(self.link.interface) or psutil.net_io_counters()
+
     def _should_capture(self) -> bool:
         """Determine if an anomaly requires PCAP capture."""
-        if not self.sliding_window:
-            return False
-        latencies = [dp["external_ping"]["avg_latency"] for dp in self.sliding_window if dp["external_ping"]["avg_latency"] is not None]
-        losses = [dp["external_ping"]["packet_loss"] for dp in self.sliding_window if dp["external_ping"]["packet_loss"] is not None]
-        if not latencies or not losses:
+        latency = self.sliding_window["latency"]
+        loss = self.sliding_window["loss"]
+        if not latency or not loss:
             return False
-        avg_latency = sum(latencies) / len(latencies)
-        max_latency = max(latencies)
-        avg_loss = sum(losses) / len(losses)
-        max_loss = max(losses)
-        return (avg_latency > 75) or (max_latency > 100) or (avg_loss > 5) or (max_loss > 10)
-
-    async def capture_pcap(self) -> None:
-        """Capture network traffic using tshark."""
-        logger.info(f"Capturing data for {self.deps.duration} seconds...")
+        return (latency.avg() > 75) or (latency.max() > 100) or (loss.avg() > 5) or (loss.max() > 10)
+
+    async def capture_pcap(self, path: str = None, duration: int = None) -> None:
+        """Capture network traffic using tshark; cancelling the capture stops tshark."""
+        path = path or self.deps.pathToFile
+        duration = duration or self.deps.duration
+        logger.info(f"Capturing data for {duration} seconds...")
         try:
-            capture_result = await asyncio.to_thread(
-                subprocess.run,
-                ["tshark", "-i", INTERFACE, "-a", f"duration:{self.deps.duration}", "-w", self.deps.pathToFile],
-                capture_output=True,
-                text=True
+            proc = await asyncio.create_subprocess_exec(
+                "tshark", "-i", self.link.interface, "-a", f"duration:{duration}", "-F", "pcap", "-w", path,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
             )
-            if capture_result.returncode != 0:
-                logger.error(f"Capture failed: {capture_result.stderr}")
+            try:
+                _, stderr = await proc.communicate()
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                raise
+            if proc.returncode != 0:
+                logger.error(f"Capture failed: {stderr.decode(errors='replace')}")
         except Exception as e:
             logger.error(f"Error during capture: {e}")
 
+    async def start_capture_stream(self, path: str = None, duration: int = None) -> tuple[CaptureStream, asyncio.Task]:
+        """Start a capture that can be analyzed while packets are still arriving."""
+        path = path or self.deps.pathToFile
+        duration = duration or self.deps.duration
+        logger.info(f"Streaming capture for {duration} seconds...")
+        if STREAMING_SOURCE == "pipe":
+            proc = await asyncio.to_thread(
+                subprocess.Popen,
+                ["tshark", "-i", self.link.interface, "-a", f"duration:{duration}", "-F", "pcap", "-w", "-"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            capture_task = asyncio.create_task(self._wait_for_process(proc))
+            return CaptureStream(path, capture_task.done, proc.stdout), capture_task
+        # Remove the previous capture so the reader cannot pick up stale packets.
+        if os.path.exists(path):
+            os.remove(path)
+        capture_task = asyncio.create_task(self.capture_pcap(path, duration))
+        return CaptureStream(path, capture_task.done), capture_task
+
+    @staticmethod
+    async def _wait_for_process(proc: subprocess.Popen) -> None:
+        try:
+            await asyncio.to_thread(proc.wait)
+        except asyncio.CancelledError:
+            proc.kill()
+            raise
+
+    def _next_window(self, duration: int) -> tuple[float, float, float]:
+        """Start, end and the previous window's end for the next ring buffer window; windows run one at a time."""
+        start = time.time()
+        previous_end, self._previous_window_end = self._previous_window_end, start + duration
+        return start, start + duration, previous_end
+
+    def stream_window(self, duration: int = None) -> CaptureStream:
+        """Follow the ring buffer over the next capture window as packets are written."""
+        follower = self.capture_manager.follow_window(*self._next_window(duration or self.deps.duration))
+        return CaptureStream(follower.name, lambda: not self.capture_manager.running, follower)
+
+    async def capture_window(self, duration: int = None) -> list:
+        """Wait for the ring buffer segments covering the next capture window."""
+        duration = duration or self.deps.duration
+        logger.info(f"Collecting ring buffer segments for {duration} seconds...")
+        segments = await self.capture_manager.wait_for_window(*self._next_window(duration))
+        self.capture_manager.lease(segments)
+        return segments
+
     async def metric_collection_loop(self) -> None:
         """Periodically collect network metrics."""
         while True:
             await self.collect_metrics()
-            await asyncio.sleep(2)
+            await asyncio.sleep(METRIC_COLLECTION_INTERVAL)
+
+    def _acquire_capture_path(self) -> str:
+        """A capture file no other in-flight cycle is using; the first one is the configured path."""
+        if self._free_capture_paths:
+            return self._free_capture_paths.pop()
+        self._capture_paths += 1
+        if self._capture_paths == 1:
+            return self.deps.pathToFile
+        root, ext = os.path.splitext(self.deps.pathToFile)
+        return f"{root}.{self._capture_paths - 1}{ext}"
+
+    async def tune(self, cycle_id: int, metrics: dict) -> None:
+        """Ask the tuning agent for this cycle's capture parameters, keeping the current ones if it does not answer in time."""
+        reply = self.tuning_replies.expect(cycle_id)
+        try:
+            with stage("tuning_wait"):
+                await self.performance_to_tuning_queue.put({
+                    "cycle_id": cycle_id,
+                    "metrics": metrics,
+                    "previous_attack_detected": self.previous_attack_detected
+                })
+                updated_deps = (await asyncio.wait_for(reply, CYCLE_TUNING_TIMEOUT))["deps"]
+        except asyncio.TimeoutError:
+            logger.warning(f"Tuning for cycle {cycle_id} on {self.link.link_id} timed out; keeping current parameters.")
+            return
+        finally:
+            self.tuning_replies.forget(cycle_id)
+        if updated_deps is not None:
+            self.deps.duration = updated_deps.duration
+            self.deps.cycle_interval = updated_deps.cycle_interval
+
+    async def request_analysis(self, cycle_id: int, capture, streaming_seconds: int = 0) -> tuple[asyncio.Future, float]:
+        """Hand a capture to the security agent; return the future for its reply and the analysis deadline."""
+        deadline = asyncio.get_running_loop().time() + streaming_seconds + CYCLE_ANALYSIS_TIMEOUT
+        reply = self.analysis_replies.expect(cycle_id)
+        await self.performance_to_security_queue.put({"cycle_id": cycle_id, "capture": capture, "deadline": deadline})
+        return reply, deadline
+
+    async def capture(self, cycle_id: int, path: str, duration: int) -> tuple[list, asyncio.Future, float]:
+        """Capture one cycle's traffic and request its analysis as soon as there is something to analyze.
+
+        Returns the ring buffer segments to release afterwards, the reply future and the analysis deadline.
+        """
+        if self.capture_manager is not None and STREAMING_ANALYSIS:
+            reply, deadline = await self.request_analysis(cycle_id, self.stream_window(duration), duration)
+            # Hold the capture slot until the window is recorded, so the next cycle's window cannot overlap it.
+            await asyncio.sleep(duration)
+            return [], reply, deadline
+        if self.capture_manager is not None:
+            segments = await self.capture_window(duration)
+            return segments, *await self.request_analysis(cycle_id, [segment.path for segment in segments])
+        if STREAMING_ANALYSIS:
+            stream, capture_task = await self.start_capture_stream(path, duration)
+            try:
+                reply, deadline = await self.request_analysis(cycle_id, stream, duration)
+                await capture_task
+            finally:
+                # A no-op once tshark has exited; otherwise this cycle was cancelled and the capture must stop.
+                capture_task.cancel()
+            return [], reply, deadline
+        await self.capture_pcap(path, duration)
+        return [], *await self.request_analysis(cycle_id, path)
+
+    async def run_cycle(self, cycle_id: int = None) -> str:
+        """Tune the capture parameters, capture, and wait for the security verdict; return the cycle's outcome.
+
+        The sliding window is cleared as the cycle starts, so the next cycle is triggered by
+        samples taken after this one began rather than by the ones that triggered it. Tuning
+        that does not answer in time keeps the current parameters; a capture or analysis that
+        overruns its timeout is cancelled and the cycle ends with the "timeout" outcome.
+        """
+        if cycle_id is None:
+            cycle_id = self.executor.next_id()
+        logger.info(f"Anomaly detected on {self.link.link_id}, coordinating with team (cycle {cycle_id}).")
+        metrics = self.sliding_window.latest
+        self.sliding_window.clear()
+        path = self._acquire_capture_path()
+        segments = []
+        try:
+            try:
+                await self.tune(cycle_id, metrics)
+                duration = self.deps.duration
+                with stage("capture"):
+                    segments, reply, deadline = await asyncio.wait_for(self.capture(cycle_id, path, duration),
+                                                                       duration + CYCLE_CAPTURE_GRACE)
+            except asyncio.TimeoutError:
+                logger.error(f"Capture for cycle {cycle_id} on {self.link.link_id} timed out.")
+                return "timeout"
+            finally:
+                self.executor.capture_done(cycle_id)
+            try:
+                with stage("analysis_wait"):
+                    # The security agent replies at its deadline; the extra second only covers a lost reply.
+                    result = await asyncio.wait_for(reply, deadline - asyncio.get_running_loop().time() + 1)
+            except asyncio.TimeoutError:
+                logger.error(f"No verdict for cycle {cycle_id} on {self.link.link_id} before its deadline.")
+                return "timeout"
+        finally:
+            self.analysis_replies.forget(cycle_id)
+            if segments:
+                self.capture_manager.release(segments)
+            self._free_capture_paths.append(path)
+        if result["status"] != "ok":
+            return "timeout" if result["status"] == "expired" else result["status"]
+        self.previous_attack_detected = result["verdict"].attack_detected
+        return "attack" if result["verdict"].attack_detected else "clean"
 
     async def anomaly_checking_loop(self) -> None:
-        """Monitor for anomalies based on cycle interval."""
-        while True:
-            current_time = time.time()
-            if current_time - self.last_check_time >= self.deps.cycle_interval:
-                self.last_check_time = current_time
-                if self._should_capture():
-                    logger.info("Anomaly detected, coordinating with team.")
-                    await self.performance_to_tuning_queue.put({
-                        "metrics": self.sliding_window[-1],
-                        "previous_attack_detected": self.previous_attack_detected
-                    })
-                    updated_deps = await self.tuning_to_performance_queue.get()
-                    self.deps.duration = updated_deps.duration
-                    self.deps.cycle_interval = updated_deps.cycle_interval
-                    await self.capture_pcap()
-                    await self.performance_to_security_queue.put(self.deps.pathToFile)
-                    analysis_result = await self.security_to_performance_queue.get()
-                    self.previous_attack_detected = analysis_result.attack_detected
-                    self.sliding_window.clear()
-            await asyncio.sleep(1)
+        """Monitor for anomalies based on cycle interval and start cycles without waiting for earlier ones."""
+        try:
+            while True:
+                current_time = time.time()
+                if current_time - self.last_check_time >= self.deps.cycle_interval:
+                    self.last_check_time = current_time
+                    if self.executor.can_start() and self._should_capture():
+                        self.executor.start(self.run_cycle)
+                await asyncio.sleep(1)
+        finally:
+            await self.executor.stop()
+            await self.tuning_replies.close()
+            await self.analysis_replies.close()
 
     async def run(self) -> None:
         """Execute metric collection and anomaly checking concurrently."""
@@ -131,47 +304,196 @@ class ParameterTuningAgent:
     def __init__(self, performance_to_tuning_queue: asyncio.Queue, tuning_to_performance_queue: asyncio.Queue):
         self.performance_to_tuning_queue = performance_to_tuning_queue
         self.tuning_to_performance_queue = tuning_to_performance_queue
+        self.tuner = HeuristicTuner()
+        self._advice = set()
+
+    @staticmethod
+    def tuning_prompt(avg_latency, avg_loss, previous_attack_detected: bool) -> str:
+        return (
+            f"Tune parameters based on current network conditions and previous analysis. "
+            f"Current average latency: {avg_latency} ms, "
+            f"current packet loss: {avg_loss} %. "
+            f"Previous attack detected: {previous_attack_detected}."
+        )
+
+    async def llm_tune(self, avg_latency, avg_loss, previous_attack_detected: bool) -> ParameterResult:
+        """Ask the parameter tuning agent for capture parameters."""
+        from agents.agent_parameter_tuning import parameter_tuning_agent  # pydantic-ai is loaded on first LLM use
+        prompt = self.tuning_prompt(avg_latency, avg_loss, previous_attack_detected)
+        with stage("tuning_llm"):
+            param_result = await parameter_tuning_agent.run(user_prompt=prompt, deps=MyDeps())
+        return param_result.data
+
+    async def advise(self, avg_latency, avg_loss, previous_attack_detected: bool) -> None:
+        """Memoize the LLM's choice for these conditions so later anomalies use it."""
+        key = self.tuner.bucket(avg_latency, avg_loss, previous_attack_detected)
+        try:
+            advice = await self.llm_tune(avg_latency, avg_loss, previous_attack_detected)
+        except Exception as e:
+            logger.error(f"Error fetching tuning advice: {e}")
+            return
+        self.tuner.learn(key, advice)
+
+    async def tune(self, avg_latency, avg_loss, previous_attack_detected: bool) -> ParameterResult:
+        """Pick capture parameters locally, or through the LLM when TUNING_MODE is "llm"."""
+        if TUNING_MODE == "llm":
+            return await self.llm_tune(avg_latency, avg_loss, previous_attack_detected)
+        param_result = self.tuner.tune(avg_latency, avg_loss, previous_attack_detected)
+        if TUNING_LLM_ADVISOR:
+            task = asyncio.create_task(self.advise(avg_latency, avg_loss, previous_attack_detected))
+            self._advice.add(task)
+            task.add_done_callback(self._advice.discard)
+        return param_result
 
     async def run(self) -> None:
-        """Adjust monitoring parameters based on network conditions."""
+        """Adjust monitoring parameters based on network conditions, replying to every request."""
         while True:
             data = await self.performance_to_tuning_queue.get()
             metrics = data["metrics"]
-            previous_attack_detected = data["previous_attack_detected"]
-            prompt = (
-                f"Tune parameters based on current network conditions and previous analysis. "
-                f"Current average latency: {metrics['aggregates']['avg_latency']} ms, "
-                f"current packet loss: {metrics['aggregates']['avg_loss']} %. "
-                f"Previous attack detected: {previous_attack_detected}."
-            )
-            param_result = await parameter_tuning_agent.run(user_prompt=prompt, deps=MyDeps())
-            updated_deps = MyDeps(duration=param_result.data.duration, cycle_interval=param_result.data.interval)
-            await self.tuning_to_performance_queue.put(updated_deps)
+            updated_deps = None
+            try:
+                param_result = await self.tune(
+                    metrics['aggregates']['avg_latency'],
+                    metrics['aggregates']['avg_loss'],
+                    data["previous_attack_detected"]
+                )
+                updated_deps = MyDeps(duration=param_result.duration, cycle_interval=param_result.interval)
+            except Exception as e:
+                logger.error(f"Error tuning parameters: {e}")
+            await self.tuning_to_performance_queue.put({"cycle_id": data["cycle_id"], "deps": updated_deps})
 
 class SecurityAnalysisAgent:
-    def __init__(self, performance_to_security_queue: asyncio.Queue, security_to_performance_queue: asyncio.Queue, attack_queue: asyncio.Queue):
+    def __init__(self, performance_to_security_queue: asyncio.Queue, security_to_performance_queue: asyncio.Queue,
+                 attack_queue: asyncio.Queue, metrics_store: MetricsStore = None, link: LinkConfig = None):
         self.performance_to_security_queue = performance_to_security_queue
         self.security_to_performance_queue = security_to_performance_queue
         self.attack_queue = attack_queue
+        self.metrics_store = metrics_store
+        self.link = link or LinkConfig(interface=INTERFACE, target=MONITOR_DEFAULT_TARGET)
+        self.verdict_engine = VerdictEngine()
+        self.latest_verdict_cycle = 0
+        self.stale_verdicts = 0
+        self._analyses = set()
+        self._details = set()
 
-    async def analyze_pcap(self, pcap_path: str) -> None:
-        """Analyze PCAP files for potential attacks."""
-        logger.info("Analyzing PCAP for attacks...")
-        try:
+    async def llm_verdict(self, pcap_path: str, packets_brief: dict) -> AnalysisResult:
+        """Ask the monitoring agent for a verdict on already-classified counts."""
+        from agents.agent_monitoring import monitoring_agent  # pydantic-ai is loaded on first LLM use
+        with stage("verdict_llm"):
             detect_result = await monitoring_agent.run(
                 user_prompt="Analyze the network data for attacks.",
-                deps=MyDeps(pathToFile=pcap_path)
+                deps=MyDeps(pathToFile=pcap_path, detection_output=str(packets_brief))
             )
-            await self.attack_queue.put({
-                "attack_detected": detect_result.data.attack_detected,
-                "details": detect_result.data.details
-            })
-            await self.security_to_performance_queue.put(detect_result.data)
+        return detect_result.data
+
+    def is_stale(self, cycle_id: int) -> bool:
+        """True when a later cycle's verdict has already been published for this link."""
+        return cycle_id is not None and cycle_id < self.latest_verdict_cycle
+
+    async def publish_llm_details(self, pcap_path: str, packets_brief: dict, verdict: AnalysisResult,
+                                  cycle_id: int = None) -> None:
+        """Publish a human-readable LLM summary for a verdict the fast path already decided."""
+        try:
+            llm_result = await self.llm_verdict(pcap_path, packets_brief)
+        except Exception as e:
+            logger.error(f"Error fetching verdict details: {e}")
+            return
+        if self.is_stale(cycle_id):
+            return
+        await self.attack_queue.put({**self.link.labels, "cycle_id": cycle_id, "attack_detected": verdict.attack_detected,
+                                     "details": llm_result.details})
+
+    async def analyze_pcap(self, pcap_path, packets_brief: dict = None, cycle_id: int = None) -> tuple[dict, AnalysisResult]:
+        """Analyze PCAP files for potential attacks and return the attack type counts and the verdict."""
+        logger.info("Analyzing PCAP for attacks...")
+        if packets_brief is None:
+            with stage("classify"):
+                packets_brief = await classify_capture_async(pcap_path)
+        verdict = self.verdict_engine.decide(packets_brief) if VERDICT_FAST_PATH else None
+        if verdict is None:
+            verdict = await self.llm_verdict(pcap_path, packets_brief)
+        elif VERDICT_LLM_DETAILS:
+            task = asyncio.create_task(self.publish_llm_details(pcap_path, packets_brief, verdict, cycle_id))
+            self._details.add(task)
+            task.add_done_callback(self._details.discard)
+        logger.info(f"Verdict fast path stats: {self.verdict_engine.stats()}")
+        return packets_brief, verdict
+
+    async def reanalyze(self, paths: list) -> tuple[dict, AnalysisResult]:
+        """Classify retained capture segments again and return the counts and verdict without publishing them."""
+        logger.info(f"Re-analyzing {len(paths)} retained capture segments...")
+        with stage("classify"):
+            packets_brief = await classify_capture_async(paths)
+        verdict = self.verdict_engine.decide(packets_brief) if VERDICT_FAST_PATH else None
+        if verdict is None:
+            verdict = await self.llm_verdict(paths, packets_brief)
+        return packets_brief, verdict
+
+    async def publish_verdict(self, cycle_id: int, packets_brief: dict, verdict: AnalysisResult) -> bool:
+        """Record and broadcast a verdict unless it is stale; return whether it was published."""
+        if self.is_stale(cycle_id):
+            self.stale_verdicts += 1
+            logger.info(f"Dropped stale verdict of cycle {cycle_id} on {self.link.link_id}; "
+                        f"cycle {self.latest_verdict_cycle} was already published.")
+            return False
+        self.latest_verdict_cycle = cycle_id or self.latest_verdict_cycle
+        if self.metrics_store is not None:
+            self.metrics_store.record_verdict(verdict.attack_detected, verdict.details, packets_brief,
+                                              link=self.link.link_id)
+        await self.attack_queue.put({
+            **self.link.labels,
+            "cycle_id": cycle_id,
+            "attack_detected": verdict.attack_detected,
+            "details": verdict.details
+        })
+        return True
+
+    async def publish_partial(self, packets_brief: dict, cycle_id: int = None) -> None:
+        """Publish per-class counts for a capture that is still being analyzed."""
+        if self.is_stale(cycle_id):
+            return
+        await self.attack_queue.put({**self.link.labels, "cycle_id": cycle_id, "partial": True, "counts": packets_brief})
+
+    async def analyze_stream(self, stream: CaptureStream, cycle_id: int = None) -> tuple[dict, AnalysisResult]:
+        """Classify a capture while it is recorded, then analyze the final counts."""
+        logger.info("Streaming PCAP analysis started...")
+        classifier = await asyncio.to_thread(get_classifier)
+        with stage("classify_stream"):
+            packets_brief = await stream_classify(stream, classifier,
+                                                  on_update=lambda counts: self.publish_partial(counts, cycle_id))
+        return await self.analyze_pcap(stream.path, packets_brief=packets_brief, cycle_id=cycle_id)
+
+    async def handle(self, request: dict) -> None:
+        """Analyze one cycle's capture before its deadline and always reply, whatever happens to the analysis."""
+        cycle_id = request["cycle_id"]
+        capture = request["capture"]
+        status, verdict = "error", None
+        try:
+            remaining = request["deadline"] - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                status = "expired"
+                logger.warning(f"Cycle {cycle_id} on {self.link.link_id} expired before its analysis started.")
+            else:
+                analysis = (self.analyze_stream(capture, cycle_id) if isinstance(capture, CaptureStream)
+                            else self.analyze_pcap(capture, cycle_id=cycle_id))
+                packets_brief, verdict = await asyncio.wait_for(analysis, remaining)
+                status = "ok" if await self.publish_verdict(cycle_id, packets_brief, verdict) else "stale"
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logger.error(f"Analysis of cycle {cycle_id} on {self.link.link_id} timed out.")
         except Exception as e:
             logger.error(f"Error during analysis: {e}")
+        finally:
+            self.security_to_performance_queue.put_nowait({"cycle_id": cycle_id, "status": status, "verdict": verdict})
 
     async def run(self) -> None:
-        """Process incoming PCAP files for analysis."""
-        while True:
-            pcap_path = await self.performance_to_security_queue.get()
-            await self.analyze_pcap(pcap_path)
\ No newline at end of file
+        """Analyze captures as they arrive, concurrently; the performance agent bounds how many are in flight."""
+        try:
+            while True:
+                request = await self.performance_to_security_queue.get()
+                task = asyncio.create_task(self.handle(request))
+                self._analyses.add(task)
+                task.add_done_callback(self._analyses.discard)
+        finally:
+            for task in self._analyses | self._details:
+                task.cancel()
@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import json
+import math
+import os
+import re
+import logging
+from common_classes import LinkConfig
+from config import (INTERFACE, CAPTURE_RING_BUFFER, CAPTURE_DIR, MONITOR_CONFIG_PATH, MONITOR_DEFAULT_TARGET,
+                    METRIC_COLLECTION_INTERVAL, SCHEDULER_SHARDS, SCHEDULER_MAX_CONCURRENCY)
+from capture_manager import CaptureManager
+from metrics_store import MetricsStore
+from network_monitor import PerformanceMonitoringAgent, ParameterTuningAgent, SecurityAnalysisAgent
+
+logger = logging.getLogger(__name__)
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+def load_links(path: str = MONITOR_CONFIG_PATH) -> list:
+    """Read the interface/target pairs to monitor; without a config file, probe MONITOR_DEFAULT_TARGET on INTERFACE.
+
+    The file lists "interfaces" (each with a "name" and optional "gateway" and "targets") and
+    top-level "targets" used by interfaces that do not list their own. A file that yields no
+    links raises ValueError.
+    """
+    if not os.path.exists(path):
+        return [LinkConfig(interface=INTERFACE, target=MONITOR_DEFAULT_TARGET)]
+    with open(path) as f:
+        config = json.load(f)
+    default_targets = config.get("targets", [MONITOR_DEFAULT_TARGET])
+    links = {}
+    for interface in config.get("interfaces", [{"name": INTERFACE}]):
+        for target in interface.get("targets", default_targets):
+            link = LinkConfig(interface=interface["name"], target=target, gateway=interface.get("gateway"))
+            links.setdefault(link.link_id, link)
+    if not links:
+        raise ValueError(f"{path} defines no links to monitor; list at least one interface with at least one target")
+    logger.info(f"Loaded {len(links)} monitored links from {path}")
+    return list(links.values())
+
+class MonitoredLink:
+    """The agents and queues that monitor one interface/target pair."""
+
+    def __init__(self, link: LinkConfig, metrics_queue: asyncio.Queue, attack_queue: asyncio.Queue,
+                 capture_manager: CaptureManager = None, metrics_store: MetricsStore = None,
+                 capture_path: str = "lastCapture/capture.pcap"):
+        self.link = link
+        self.collecting = False
+        performance_to_tuning_queue = asyncio.Queue()
+        tuning_to_performance_queue = asyncio.Queue()
+        performance_to_security_queue = asyncio.Queue()
+        security_to_performance_queue = asyncio.Queue()
+        self.performance_agent = PerformanceMonitoringAgent(
+            metrics_queue, performance_to_tuning_queue, tuning_to_performance_queue,
+            performance_to_security_queue, security_to_performance_queue, capture_manager, metrics_store,
+            link=link, capture_path=capture_path
+        )
+        self.tuning_agent = ParameterTuningAgent(performance_to_tuning_queue, tuning_to_performance_queue)
+        self.security_agent = SecurityAnalysisAgent(
+            performance_to_security_queue, security_to_performance_queue, attack_queue, metrics_store, link=link
+        )
+
+    def loops(self) -> list:
+        """Coroutines that run for the lifetime of the link; metric collection is driven by the scheduler."""
+        return [self.performance_agent.anomaly_checking_loop(), self.tuning_agent.run(), self.security_agent.run()]
+
+class MonitorScheduler:
+    """Runs monitoring for many interface/target links from one process.
+
+    Every link has its own agents, queues and MyDeps, so an anomaly cycle on one link never
+    holds up another; links on the same interface share one ring buffer capture. Metric
+    collections are spread evenly over the collection interval by giving each link a fixed
+    phase, are scheduled by `shards` tasks that each own a slice of the links, and are capped
+    at `max_concurrency` in flight. A link whose previous collection is still running skips
+    its turn instead of piling up.
+    """
+
+    def __init__(self, links: list, metrics_queue: asyncio.Queue, attack_queue: asyncio.Queue,
+                 metrics_store: MetricsStore = None, ring_buffer: bool = CAPTURE_RING_BUFFER,
+                 interval: float = METRIC_COLLECTION_INTERVAL, shards: int = SCHEDULER_SHARDS,
+                 max_concurrency: int = SCHEDULER_MAX_CONCURRENCY):
+        if not links:
+            raise ValueError("MonitorScheduler needs at least one link")
+        self.links = links
+        self.metrics_queue = metrics_queue
+        self.attack_queue = attack_queue
+        self.metrics_store = metrics_store
+        self.ring_buffer = ring_buffer
+        self.interval = interval
+        self.shards = max(1, min(shards, len(links)))
+        self.capture_managers = {}
+        self.monitored = []
+        self.collections = 0
+        self.skipped = 0
+        self.failures = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = set()
+        self._tasks = []
+
+    async def start(self) -> None:
+        os.makedirs("lastCapture", exist_ok=True)
+        if self.ring_buffer:
+            for interface in dict.fromkeys(link.interface for link in self.links):
+                directory = CAPTURE_DIR if len(self.links) == 1 else os.path.join(CAPTURE_DIR, _safe_name(interface))
+                capture_manager = CaptureManager(interface=interface, directory=directory)
+                if await capture_manager.start():
+                    self.capture_managers[interface] = capture_manager
+                else:
+                    logger.warning(f"Falling back to per-cycle captures on {interface}")
+        for link in self.links:
+            capture_path = ("lastCapture/capture.pcap" if len(self.links) == 1
+                            else os.path.join("lastCapture", f"{_safe_name(link.link_id)}.pcap"))
+            monitored = MonitoredLink(link, self.metrics_queue, self.attack_queue,
+                                      self.capture_managers.get(link.interface), self.metrics_store, capture_path)
+            self.monitored.append(monitored)
+            self._tasks.extend(asyncio.create_task(loop) for loop in monitored.loops())
+        start = asyncio.get_running_loop().time()
+        phases = [(start + index * self.interval / len(self.monitored), index, monitored)
+                  for index, monitored in enumerate(self.monitored)]
+        for shard in range(self.shards):
+            self._tasks.append(asyncio.create_task(self._run_shard(phases[shard::self.shards])))
+        logger.info(f"Monitoring {len(self.links)} links on {len(self.capture_managers) or 'per-cycle'} captures "
+                    f"with {self.shards} scheduler shards")
+
+    async def _run_shard(self, schedule: list) -> None:
+        loop = asyncio.get_running_loop()
+        heap = list(schedule)
+        heapq.heapify(heap)
+        while True:
+            due, index, monitored = heap[0]
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            # Keep the link's phase; intervals missed while the loop was busy are skipped, not replayed.
+            missed = max(0, math.ceil((now - due) / self.interval) - 1)
+            heapq.heapreplace(heap, (due + (missed + 1) * self.interval, index, monitored))
+            if monitored.collecting:
+                self.skipped += 1
+                continue
+            await self._slots.acquire()
+            monitored.collecting = True
+            task = asyncio.create_task(self._collect(monitored))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _collect(self, monitored: MonitoredLink) -> None:
+        try:
+            await monitored.performance_agent.collect_metrics()
+            self.collections += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error collecting metrics for {monitored.link.link_id}: {e}")
+        finally:
+            monitored.collecting = False
+            self._slots.release()
+
+    async def reanalyze_window(self, link_id: str, start: float, end: float) -> dict:
+        """Classify a past window of one link again from its retained ring buffer segments, without recapturing.
+
+        Raises LookupError for an unknown link, a link without a ring buffer, or a window with no segments left.
+        """
+        monitored = next((m for m in self.monitored if m.link.link_id == link_id), None)
+        if monitored is None:
+            raise LookupError(f"Unknown link {link_id}")
+        capture_manager = self.capture_managers.get(monitored.link.interface)
+        if capture_manager is None:
+            raise LookupError(f"No ring buffer capture on {monitored.link.interface}")
+        segments = capture_manager.lease_window(start, end)
+        if not segments:
+            raise LookupError(f"No retained capture segments on {monitored.link.interface} between {start} and {end}")
+        try:
+            packets_brief, verdict = await monitored.security_agent.reanalyze([segment.path for segment in segments])
+        finally:
+            capture_manager.release(segments)
+        return {
+            **monitored.link.labels,
+            "segments": [{"seq": s.seq, "start": s.start, "end": s.end} for s in segments],
+            "counts": packets_brief,
+            "attack_detected": verdict.attack_detected,
+            "details": verdict.details,
+        }
+
+    def queue_depths(self) -> dict:
+        """Items waiting in each inter-agent queue, summed over links."""
+        depths = {"metrics": self.metrics_queue.qsize(), "attack": self.attack_queue.qsize()}
+        for name in ("performance_to_tuning", "tuning_to_performance", "performance_to_security", "security_to_performance"):
+            depths[name] = sum(getattr(m.performance_agent, f"{name}_queue").qsize() for m in self.monitored)
+        return {name: {"depth": depth} for name, depth in depths.items()}
+
+    def agent_stats(self) -> dict:
+        """Verdict fast path, tuner memo and anomaly cycle counters, summed over links."""
+        fast_path = sum(m.security_agent.verdict_engine.fast_path_decisions for m in self.monitored)
+        escalations = sum(m.security_agent.verdict_engine.escalations for m in self.monitored)
+        cycles = {}
+        for m in self.monitored:
+            for key, value in m.performance_agent.executor.stats().items():
+                cycles[key] = cycles.get(key, 0) + value
+        return {
+            "verdict_fast_path_decisions": fast_path,
+            "verdict_llm_escalations": escalations,
+            "tuner_memo_hits": sum(m.tuning_agent.tuner.hits for m in self.monitored),
+            "tuner_memo_misses": sum(m.tuning_agent.tuner.misses for m in self.monitored),
+            "stale_verdicts": sum(m.security_agent.stale_verdicts for m in self.monitored),
+            "stale_replies": sum(m.performance_agent.tuning_replies.stale + m.performance_agent.analysis_replies.stale
+                                 for m in self.monitored),
+            **cycles,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "links": len(self.monitored),
+            "collections": self.collections,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+        }
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._in_flight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        for capture_manager in self.capture_managers.values():
+            await capture_manager.stop()
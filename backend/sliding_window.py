@@ -0,0 +1,113 @@
+import math
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+
+class MetricWindow:
+    """Fixed-capacity window over one numeric series with incrementally maintained aggregates.
+
+    Values live in a preallocated ring array; missing samples take a slot but are ignored by
+    the aggregates. Sum and count are updated on append and evict, the maximum comes from a
+    monotonic deque, and a sorted copy of the values serves percentiles without a rescan.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._values = array("d", [math.nan] * capacity)
+        self._appended = 0
+        self._sum = 0.0
+        self._count = 0
+        self._max = deque()
+        self._sorted = []
+
+    def append(self, value) -> None:
+        slot = self._appended % self.capacity
+        if self._appended >= self.capacity:
+            evicted = self._values[slot]
+            if not math.isnan(evicted):
+                self._sum -= evicted
+                self._count -= 1
+                del self._sorted[bisect_left(self._sorted, evicted)]
+        while self._max and self._max[0][0] <= self._appended - self.capacity:
+            self._max.popleft()
+        if value is None:
+            self._values[slot] = math.nan
+        else:
+            value = float(value)
+            self._values[slot] = value
+            self._sum += value
+            self._count += 1
+            insort(self._sorted, value)
+            while self._max and self._max[-1][1] <= value:
+                self._max.pop()
+            self._max.append((self._appended, value))
+        self._appended += 1
+        if slot == self.capacity - 1:
+            # Re-derive the running sum once per lap so float error cannot accumulate.
+            self._sum = math.fsum(self._sorted)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def avg(self):
+        return self._sum / self._count if self._count else None
+
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    def percentile(self, p: float):
+        """Linearly interpolated percentile (0-100) of the values in the window."""
+        if not self._count:
+            return None
+        rank = (self._count - 1) * p / 100
+        lower = math.floor(rank)
+        upper = min(lower + 1, self._count - 1)
+        return self._sorted[lower] + (self._sorted[upper] - self._sorted[lower]) * (rank - lower)
+
+    def clear(self) -> None:
+        for slot in range(self.capacity):
+            self._values[slot] = math.nan
+        self._appended = 0
+        self._sum = 0.0
+        self._count = 0
+        self._max.clear()
+        self._sorted.clear()
+
+class SlidingWindow:
+    """Sliding window of the last `capacity` data points, one MetricWindow per numeric field."""
+
+    def __init__(self, capacity: int, fields: tuple, percentiles: tuple = ()):
+        self.percentiles = percentiles
+        self.metrics = {field: MetricWindow(capacity) for field in fields}
+        self.latest = None
+        self._size = 0
+        self._capacity = capacity
+
+    def append(self, data_point: dict, **values) -> None:
+        """Add a data point; fields missing from `values` are recorded as missing samples."""
+        for field, metric in self.metrics.items():
+            metric.append(values.get(field))
+        self.latest = data_point
+        self._size = min(self._size + 1, self._capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, field: str) -> MetricWindow:
+        return self.metrics[field]
+
+    def aggregates(self) -> dict:
+        """avg/max and the configured percentiles of every field, keyed like "avg_latency"."""
+        result = {}
+        for field, metric in self.metrics.items():
+            result[f"avg_{field}"] = metric.avg()
+            result[f"max_{field}"] = metric.max()
+            for p in self.percentiles:
+                result[f"p{p}_{field}"] = metric.percentile(p)
+        return result
+
+    def clear(self) -> None:
+        for metric in self.metrics.values():
+            metric.clear()
+        self.latest = None
+        self._size = 0
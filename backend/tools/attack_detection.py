@@ -1,22 +1,168 @@
-import torch
-from scapy.all import PcapReader, IP, TCP
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from secretKeys import *
+import hashlib
+import random
+import threading
+import time
+import logging
+from collections import OrderedDict
+from config import (CLASSIFIER_MODEL_NAME, CLASSIFIER_BATCH_SIZE, CLASSIFIER_NUM_THREADS, CLASSIFIER_BACKEND,
+                    FAST_PCAP_PARSER, FLOW_SAMPLE_BUDGET, VERDICT_CACHE_SIZE)
+from tools.fast_pcap import PcapFile, UnsupportedCaptureError, MAX_INPUT_CHARS
+from tools.classifier_backends import load_backend, WARM_UP_LINE
+from instrumentation import stage
+
+# torch, transformers and scapy are imported where they are first needed so that importing
+# the pipeline (and starting the service) does not pay for them up front.
+
+logger = logging.getLogger(__name__)
+
+CLASSES = [
+    'Analysis', 'Backdoor', 'Bot', 'DDoS', 'DoS', 'DoS GoldenEye', 'DoS Hulk',
+    'DoS SlowHTTPTest', 'DoS Slowloris', 'Exploits', 'FTP Patator', 'Fuzzers',
+    'Generic', 'Heartbleed', 'Infiltration', 'Normal', 'Port Scan', 'Reconnaissance',
+    'SSH Patator', 'Shellcode', 'Web Attack - Brute Force', 'Web Attack - SQL Injection',
+    'Web Attack - XSS', 'Worms'
+]
+
+class VerdictCache:
+    """Bounded LRU of predicted class indices keyed on a digest of the truncated input line."""
+
+    def __init__(self, maxsize=VERDICT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(line):
+        return hashlib.blake2b(line.encode(), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            predicted_class = self._entries.get(key)
+            if predicted_class is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return predicted_class
+
+    def put(self, key, predicted_class):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = predicted_class
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"entries": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate}
+
+class ClassificationPlan:
+    """Groups packets by flow, samples each flow under a budget and deduplicates feature strings.
+
+    Only the unique, uncached lines returned by pending() go through the model; resolve() then
+    weights each flow's sampled verdicts back up to the flow's packet count.
+    """
+
+    def __init__(self, cache, flow_budget=FLOW_SAMPLE_BUDGET, seed=0):
+        self.cache = cache
+        self.flow_budget = flow_budget
+        self.packets = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._rng = random.Random(seed)
+        self._flow_packets = {}
+        self._flow_samples = {}
+        self._verdicts = {}
+        self._keys = {}
+
+    @property
+    def flows(self):
+        return len(self._flow_packets)
+
+    @property
+    def cache_hit_rate(self):
+        """Share of this plan's cache lookups that hit, unaffected by other captures sharing the cache."""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def add(self, flow_key, line):
+        self.packets += 1
+        seen = self._flow_packets.get(flow_key, 0) + 1
+        self._flow_packets[flow_key] = seen
+        samples = self._flow_samples.setdefault(flow_key, [])
+        if not self.flow_budget or len(samples) < self.flow_budget:
+            samples.append(line)
+        else:
+            # Reservoir sampling keeps a uniform sample over the whole flow.
+            slot = self._rng.randrange(seen)
+            if slot < self.flow_budget:
+                samples[slot] = line
+
+    def pending(self):
+        """Resolve sampled lines from the cache and return the unique ones that still need the model."""
+        pending = []
+        for samples in self._flow_samples.values():
+            for line in samples:
+                if line in self._verdicts:
+                    continue
+                key = self._keys[line] = VerdictCache.key(line)
+                predicted_class = self._verdicts[line] = self.cache.get(key)
+                if predicted_class is None:
+                    self.cache_misses += 1
+                    pending.append(line)
+                else:
+                    self.cache_hits += 1
+        return pending
+
+    def resolve(self, pending, predictions, classes):
+        """Record model predictions for the pending lines and return weighted attack type counts."""
+        for line, predicted_class in zip(pending, predictions):
+            self._verdicts[line] = predicted_class
+            self.cache.put(self._keys[line], predicted_class)
+        weighted = {}
+        for flow_key, samples in self._flow_samples.items():
+            weight = self._flow_packets[flow_key] / len(samples)
+            for line in samples:
+                predicted_attack = classes[self._verdicts[line]]
+                weighted[predicted_attack] = weighted.get(predicted_attack, 0.0) + weight
+        return _apportion(weighted, self.packets)
+
+def _apportion(weighted, total):
+    """Round weighted counts to integers that still sum to the packet total (largest remainder)."""
+    counts = {attack: int(weight) for attack, weight in weighted.items()}
+    remainder = total - sum(counts.values())
+    by_fraction = sorted(weighted, key=lambda attack: weighted[attack] - counts[attack], reverse=True)
+    for attack in by_fraction[:max(remainder, 0)]:
+        counts[attack] += 1
+    return {attack: count for attack, count in counts.items() if count}
 
 class PcapClassifier:
-    def __init__(self, model_name="rdpahalavan/bert-network-packet-flow-header-payload"):
-        self.classes = [
-            'Analysis', 'Backdoor', 'Bot', 'DDoS', 'DoS', 'DoS GoldenEye', 'DoS Hulk',
-            'DoS SlowHTTPTest', 'DoS Slowloris', 'Exploits', 'FTP Patator', 'Fuzzers',
-            'Generic', 'Heartbleed', 'Infiltration', 'Normal', 'Port Scan', 'Reconnaissance',
-            'SSH Patator', 'Shellcode', 'Web Attack - Brute Force', 'Web Attack - SQL Injection',
-            'Web Attack - XSS', 'Worms'
-        ]
+    def __init__(self, model_name=CLASSIFIER_MODEL_NAME, batch_size=CLASSIFIER_BATCH_SIZE,
+                 num_threads=CLASSIFIER_NUM_THREADS, backend=CLASSIFIER_BACKEND):
+        from transformers import AutoTokenizer
+        self.classes = list(CLASSES)
+        self.batch_size = batch_size
+        started = time.perf_counter()
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.backend = load_backend(backend, model_name, self.tokenizer, num_threads)
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"Loaded {self.backend.name} classifier backend in {self.load_seconds:.2f}s")
+        self.cache = VerdictCache()
+        self.last_stats = {}
 
-    def processing_packet_conversion(self, packet):
+    @staticmethod
+    def processing_packet_conversion(packet):
         """Convert packet data into a feature string for classification."""
+        from scapy.all import IP, TCP
         if IP not in packet or TCP not in packet:
             return None
         try:
@@ -34,24 +180,125 @@ class PcapClassifier:
         except Exception:
             return None
 
-    def classify_pcap(self, file_path, filter=None):
-        """Classify packets in a PCAP file and return attack type counts."""
-        packets_brief = {}
+    @staticmethod
+    def flow_key(packet):
+        """Return the direction-independent 5-tuple of a scapy IPv4/TCP packet."""
+        from scapy.all import IP, TCP
+        source = (packet[IP].src, packet[TCP].sport)
+        destination = (packet[IP].dst, packet[TCP].dport)
+        return (6, source, destination) if source <= destination else (6, destination, source)
+
+    @classmethod
+    def iter_input_records(cls, file_path):
+        """Yield (flow key, feature string) for every IPv4/TCP packet in a PCAP file or list of files."""
+        if not isinstance(file_path, str):
+            for path in file_path:
+                yield from cls.iter_input_records(path)
+            return
+        if FAST_PCAP_PARSER:
+            try:
+                pcap = PcapFile(file_path)
+            except UnsupportedCaptureError as e:
+                logger.info(f"Fast parser unavailable for {file_path} ({e}); using scapy.")
+            else:
+                with pcap:
+                    yield from pcap.records()
+                return
+        from scapy.all import PcapReader
         with PcapReader(file_path) as pcap:
             for pkt in pcap:
-                input_line = self.processing_packet_conversion(pkt)
+                input_line = cls.processing_packet_conversion(pkt)
                 if input_line:
-                    truncated_line = input_line[:1024]
-                    tokens = self.tokenizer(truncated_line, return_tensors="pt")
-                    outputs = self.model(**tokens)
-                    probabilities = outputs.logits.softmax(dim=1)
-                    predicted_class = torch.argmax(probabilities, dim=1).item()
-                    predicted_attack = self.classes[predicted_class]
-                    packets_brief[predicted_attack] = packets_brief.get(predicted_attack, 0) + 1
+                    yield cls.flow_key(pkt), input_line[:MAX_INPUT_CHARS]
+
+    @classmethod
+    def plan_pcap(cls, file_path, cache, flow_budget=FLOW_SAMPLE_BUDGET):
+        """Parse a PCAP file into a classification plan without touching the model."""
+        plan = ClassificationPlan(cache, flow_budget)
+        with stage("parse"):
+            for flow_key, input_line in cls.iter_input_records(file_path):
+                plan.add(flow_key, input_line)
+        return plan
+
+    def predict(self, lines):
+        """Return the predicted class index for each feature string, batch by batch."""
+        predictions = []
+        for start in range(0, len(lines), self.batch_size):
+            batch = [line[:MAX_INPUT_CHARS] for line in lines[start:start + self.batch_size]]
+            with stage("tokenize"):
+                tokens = self.tokenizer(batch, padding=True, truncation=True, return_tensors=self.backend.return_tensors)
+            with stage("forward"):
+                predictions.extend(self.backend.predict(tokens))
+        return predictions
+
+    def classify_lines(self, lines):
+        """Classify feature strings and return attack type counts."""
+        plan = ClassificationPlan(self.cache, flow_budget=0)
+        for line in lines:
+            plan.add(None, line[:MAX_INPUT_CHARS])
+        pending = plan.pending()
+        return plan.resolve(pending, self.predict(pending), self.classes)
+
+    def classify_pcap(self, file_path, filter=None):
+        """Classify packets in a PCAP file and return attack type counts."""
+        started = time.perf_counter()
+        plan = self.plan_pcap(file_path, self.cache)
+        pending = plan.pending()
+        packets_brief = plan.resolve(pending, self.predict(pending), self.classes)
+        self.last_stats = plan_stats(plan, len(pending), time.perf_counter() - started, self.cache)
         return packets_brief
 
+def plan_stats(plan, inferred, elapsed, cache):
+    """Summarize how much model work a classification plan avoided and how fast it ran."""
+    return {
+        "packets": plan.packets,
+        "flows": plan.flows,
+        "inferred": inferred,
+        "work_avoided": 1 - inferred / plan.packets if plan.packets else 0.0,
+        "cache_hit_rate": plan.cache_hit_rate,
+        "cache_lifetime_hit_rate": cache.hit_rate,
+        "seconds": elapsed,
+        "packets_per_sec": plan.packets / elapsed if elapsed > 0 else 0.0,
+    }
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """Return the process-wide classifier, loading the model on first use."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = PcapClassifier()
+    return _classifier
+
+def classifier_loaded():
+    return _classifier is not None
+
+def warm_up():
+    """Load the shared classifier and run one prediction so the first capture does not pay for either."""
+    classifier = get_classifier()
+    classifier.predict([WARM_UP_LINE])
+    return classifier
+
+def classifier_stats():
+    """Verdict cache and last classification stats, without loading the model."""
+    if _classifier is None:
+        return {}
+    return {"backend": _classifier.backend.name, "load_seconds": _classifier.load_seconds, **_classifier.cache.stats(),
+            **{f"last_{key}": value for key, value in _classifier.last_stats.items()}}
+
+def classify_capture(path):
+    """Return attack type counts for a PCAP file using the shared classifier."""
+    classifier = get_classifier()
+    results = classifier.classify_pcap(path)
+    stats = classifier.last_stats
+    logger.info(f"Classified {stats['packets']} packets in {stats['flows']} flows in {stats['seconds']:.2f}s "
+                f"({stats['packets_per_sec']:.1f} packets/sec, {stats['inferred']} model inferences, "
+                f"cache hit rate {stats['cache_hit_rate']:.1%})")
+    return results
+
 def detect_attack_func(path):
     """Detect attacks in a PCAP file."""
-    classifier = PcapClassifier()
-    results = classifier.classify_pcap(path)
-    return str(results)
\ No newline at end of file
+    return str(classify_capture(path))
@@ -0,0 +1,171 @@
+import os
+import re
+import logging
+from config import CLASSIFIER_TORCHSCRIPT_PATH, CLASSIFIER_ONNX_DIR
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_LINE = "0 0 195 -1 51234 443 40 0 64 0 5 -1"
+INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+def _atomic_save(save, path):
+    """Write a model file then rename it, so pool workers exporting at the same time never load a partial file."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    save(partial)
+    os.replace(partial, path)
+
+def _logits_module(model):
+    import torch
+
+    class LogitsModule(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+    return LogitsModule(model).eval()
+
+def _example_inputs(tokenizer):
+    example = tokenizer([WARM_UP_LINE] * 2, padding=True, return_tensors="pt")
+    return tuple(example[name] for name in INPUT_NAMES)
+
+def export_torchscript(model, tokenizer, path):
+    """Trace a sequence classifier to a TorchScript file that maps (input_ids, attention_mask, token_type_ids) to logits."""
+    import torch
+    with torch.inference_mode():
+        traced = torch.jit.trace(_logits_module(model), _example_inputs(tokenizer), check_trace=False)
+    _atomic_save(lambda partial: torch.jit.save(traced, partial), path)
+
+def export_onnx(model_name, tokenizer, path, quantize=False):
+    """Export a sequence classifier to ONNX with dynamic batch and sequence dimensions.
+
+    The graph is exported with plain (non-SDPA) attention so ONNX Runtime's BERT optimizer
+    can fuse it into Attention and SkipLayerNormalization nodes; with `quantize` the weights
+    of the unfused graph are dynamically quantized to int8 instead.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, attn_implementation="eager").eval()
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes["logits"] = {0: "batch"}
+    exported = f"{path}.{os.getpid()}.export"
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(_logits_module(model), _example_inputs(tokenizer), exported, input_names=list(INPUT_NAMES),
+                          output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=17, dynamo=False)
+    try:
+        if quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            _atomic_save(lambda partial: quantize_dynamic(exported, partial, weight_type=QuantType.QInt8), path)
+        else:
+            from onnxruntime.transformers.optimizer import optimize_model
+            optimized = optimize_model(exported, model_type="bert", num_heads=model.config.num_attention_heads,
+                                       hidden_size=model.config.hidden_size)
+            _atomic_save(optimized.save_model_to_file, path)
+    finally:
+        if os.path.exists(exported):
+            os.remove(exported)
+
+def default_onnx_path(model_name, quantize=False):
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name.strip("/"))
+    return os.path.join(CLASSIFIER_ONNX_DIR, f"{name}.int8.onnx" if quantize else f"{name}.onnx")
+
+class EagerBackend:
+    """The full-precision PyTorch model, optionally through a TorchScript trace; the reference for the others."""
+    name = "eager"
+    return_tensors = "pt"
+
+    def __init__(self, model_name, tokenizer, num_threads=None, torchscript_path=CLASSIFIER_TORCHSCRIPT_PATH):
+        import torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.scripted = bool(torchscript_path) and os.path.exists(torchscript_path)
+        if self.scripted:
+            self.model = torch.jit.load(torchscript_path)
+        else:
+            self.model = self.load_model(model_name)
+        self.model.eval()
+        if torchscript_path and not self.scripted:
+            export_torchscript(self.model, tokenizer, torchscript_path)
+            logger.info(f"Saved TorchScript classifier to {torchscript_path} for faster loading next time.")
+
+    @staticmethod
+    def load_model(model_name):
+        from transformers import AutoModelForSequenceClassification
+        return AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    def logits(self, tokens):
+        if self.scripted:
+            return self.model(*(tokens[name] for name in INPUT_NAMES))
+        return self.model(**tokens).logits
+
+    def predict(self, tokens):
+        """Return the predicted class index for each row of a tokenized batch."""
+        import torch
+        with torch.inference_mode():
+            return self.logits(tokens).argmax(dim=1).tolist()
+
+class QuantizedBackend(EagerBackend):
+    """The PyTorch model with its Linear layers dynamically quantized to int8 weights."""
+    name = "quantized"
+
+    def __init__(self, model_name, tokenizer, num_threads=None):
+        import torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.scripted = False
+        # Activations stay float and are quantized per batch, so no calibration data is needed.
+        self.model = torch.ao.quantization.quantize_dynamic(self.load_model(model_name), {torch.nn.Linear},
+                                                            dtype=torch.qint8, inplace=True)
+
+class OnnxBackend:
+    """The model exported to ONNX and run by ONNX Runtime with all graph optimizations enabled.
+
+    The export is written once under CLASSIFIER_ONNX_DIR and reused, so later loads need
+    neither the PyTorch weights nor torch itself for inference.
+    """
+    name = "onnx"
+    return_tensors = "np"
+    quantize = False
+
+    def __init__(self, model_name, tokenizer, num_threads=None):
+        import onnxruntime
+        self.path = default_onnx_path(model_name, self.quantize)
+        if not os.path.exists(self.path):
+            export_onnx(model_name, tokenizer, self.path, self.quantize)
+            logger.info(f"Exported ONNX classifier to {self.path}.")
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def predict(self, tokens):
+        """Return the predicted class index for each row of a tokenized batch."""
+        logits = self.session.run(["logits"], {name: tokens[name].astype("int64") for name in self.input_names})[0]
+        return logits.argmax(axis=1).tolist()
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """The ONNX export with int8 weights, run by ONNX Runtime's integer kernels."""
+    name = "onnx_int8"
+    quantize = True
+
+BACKENDS = {backend.name: backend for backend in (EagerBackend, QuantizedBackend, OnnxBackend, QuantizedOnnxBackend)}
+
+def load_backend(name, model_name, tokenizer, num_threads=None):
+    """Build the inference backend called `name`, falling back to eager when its optional packages are missing."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    try:
+        return BACKENDS[name](model_name, tokenizer, num_threads)
+    except ImportError as e:
+        if name == "eager":
+            raise
+        logger.warning(f"Classifier backend {name} unavailable ({e}); using eager PyTorch.")
+        return EagerBackend(model_name, tokenizer, num_threads)
@@ -1,10 +1,9 @@
 import subprocess
+from config import INTERFACE
 
-# INTERFACE = "Wi-Fi"  # Network interface for capture
-INTERFACE = "en0"
 OUTPUT_FILE = "lastCapture/capture.pcap"
 
 def collect_data_func(duration):
     """Capture network data using tshark."""
-    cmd = ["tshark", "-i", INTERFACE, "-a", f"duration:{duration}", "-w", OUTPUT_FILE]
+    cmd = ["tshark", "-i", INTERFACE, "-a", f"duration:{duration}", "-F", "pcap", "-w", OUTPUT_FILE]
     subprocess.run(cmd)
\ No newline at end of file
@@ -0,0 +1,174 @@
+import mmap
+import struct
+
+MAX_INPUT_CHARS = 1024
+
+# Link-layer types (pcap DLT values) the fast path understands.
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_LINUX_SLL2 = 276
+SUPPORTED_LINKTYPES = {LINKTYPE_NULL, LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_LOOP,
+                       LINKTYPE_LINUX_SLL, LINKTYPE_IPV4, LINKTYPE_LINUX_SLL2}
+
+_MAGIC_ENDIAN = {
+    b"\xd4\xc3\xb2\xa1": "<", b"\xa1\xb2\xc3\xd4": ">",  # microsecond timestamps
+    b"\x4d\x3c\xb2\xa1": "<", b"\xa1\xb2\x3c\x4d": ">",  # nanosecond timestamps
+}
+_ETHERTYPE_IPV4 = 0x0800
+_VLAN_ETHERTYPES = (0x8100, 0x88a8, 0x9100)
+_AF_INET_VALUES = (2, 0x02000000)
+
+# Precomputed decimal token for every byte value.
+_BYTE_TOKENS = [str(byte) for byte in range(256)]
+
+class UnsupportedCaptureError(ValueError):
+    """Raised when a capture is not a classic pcap with a supported link type."""
+
+def parse_global_header(header: bytes) -> tuple[str, int]:
+    """Return the (struct endianness, link type) of a 24-byte pcap global header."""
+    if len(header) < 24:
+        raise UnsupportedCaptureError("Truncated pcap global header")
+    endian = _MAGIC_ENDIAN.get(bytes(header[:4]))
+    if endian is None:
+        raise UnsupportedCaptureError("Not a classic pcap file (pcapng or unknown magic)")
+    linktype = struct.unpack_from(endian + "I", header, 20)[0] & 0x0FFFFFFF
+    if linktype not in SUPPORTED_LINKTYPES:
+        raise UnsupportedCaptureError(f"Unsupported link type {linktype}")
+    return endian, linktype
+
+def _locate_ipv4(linktype: int, frame) -> tuple[int, int]:
+    """Return (IP header offset, offset of the first layer after the outermost header), or (-1, -1)."""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return -1, -1
+        ethertype = (frame[12] << 8) | frame[13]
+        offset = 14
+        while ethertype in _VLAN_ETHERTYPES and len(frame) >= offset + 4:
+            ethertype = (frame[offset + 2] << 8) | frame[offset + 3]
+            offset += 4
+        return (offset, 14) if ethertype == _ETHERTYPE_IPV4 else (-1, -1)
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        if not frame or frame[0] >> 4 != 4:
+            return -1, -1
+        return 0, (frame[0] & 0x0F) * 4
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16 or ((frame[14] << 8) | frame[15]) != _ETHERTYPE_IPV4:
+            return -1, -1
+        return 16, 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(frame) < 20 or ((frame[0] << 8) | frame[1]) != _ETHERTYPE_IPV4:
+            return -1, -1
+        return 20, 20
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if len(frame) < 4 or struct.unpack_from(">I", frame, 0)[0] not in _AF_INET_VALUES:
+            return -1, -1
+        return 4, 4
+    return -1, -1
+
+def frame_to_record(linktype: int, frame):
+    """Return (flow key, feature string) for an IPv4/TCP frame, or None for anything else.
+
+    The feature string matches PcapClassifier.processing_packet_conversion: lengths count every
+    captured byte from the start of the layer, and the payload is the layer after the outermost
+    header. The flow key is the 5-tuple with both directions mapped to the same key.
+    """
+    ip_offset, payload_offset = _locate_ipv4(linktype, frame)
+    if ip_offset < 0 or len(frame) < ip_offset + 20:
+        return None
+    ihl = (frame[ip_offset] & 0x0F) * 4
+    fragment_offset = ((frame[ip_offset + 6] & 0x1F) << 8) | frame[ip_offset + 7]
+    if frame[ip_offset + 9] != 6 or fragment_offset or ihl < 20:
+        return None
+    tcp_offset = ip_offset + ihl
+    if len(frame) < tcp_offset + 20:
+        return None
+    src_port, dst_port = struct.unpack_from(">HH", frame, tcp_offset)
+    ip_length = len(frame) - ip_offset
+    payload_length = len(frame) - payload_offset
+    prefix = (f"0 0 195 -1 {src_port} {dst_port} {ip_length} {payload_length} "
+              f"{frame[ip_offset + 8]} {frame[ip_offset + 1]} {frame[tcp_offset + 12] >> 4} -1 ")
+    # Every token plus its separator takes at least two characters, so this many bytes
+    # always fills the truncated line without converting the rest of the payload.
+    needed = (MAX_INPUT_CHARS - len(prefix)) // 2 + 1
+    payload = frame[payload_offset:payload_offset + max(needed, 0)]
+    line = (prefix + " ".join(map(_BYTE_TOKENS.__getitem__, payload)))[:MAX_INPUT_CHARS]
+    source = (bytes(frame[ip_offset + 12:ip_offset + 16]), src_port)
+    destination = (bytes(frame[ip_offset + 16:ip_offset + 20]), dst_port)
+    flow_key = (6, source, destination) if source <= destination else (6, destination, source)
+    return flow_key, line
+
+def frame_to_line(linktype: int, frame):
+    """Build the classifier feature string for an IPv4/TCP frame, or None for anything else."""
+    record = frame_to_record(linktype, frame)
+    return record[1] if record else None
+
+class PcapFile:
+    """Memory-mapped classic pcap file whose records are walked without dissection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise UnsupportedCaptureError("Empty capture file")
+        try:
+            self.endian, self.linktype = parse_global_header(self._buf[:24])
+        except UnsupportedCaptureError:
+            self.close()
+            raise
+
+    def frames(self):
+        """Yield the bytes of each captured frame, stopping at a truncated trailing record."""
+        buf = self._buf
+        record = struct.Struct(self.endian + "IIII")
+        offset, end = 24, len(buf)
+        while offset + 16 <= end:
+            _, _, captured_length, _ = record.unpack_from(buf, offset)
+            offset += 16
+            if offset + captured_length > end:
+                break
+            yield buf[offset:offset + captured_length]
+            offset += captured_length
+
+    def records(self):
+        """Yield (flow key, feature string) for every IPv4/TCP frame."""
+        for frame in self.frames():
+            record = frame_to_record(self.linktype, frame)
+            if record:
+                yield record
+
+    def lines(self):
+        """Yield the feature string of every IPv4/TCP frame."""
+        for _, line in self.records():
+            yield line
+
+    def close(self) -> None:
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_stream_lines(source, endian: str, linktype: int):
+    """Yield feature strings from a pcap byte stream whose global header was already consumed."""
+    record = struct.Struct(endian + "IIII")
+    while True:
+        header = source.read(16)
+        if len(header) < 16:
+            return
+        _, _, captured_length, _ = record.unpack(header)
+        frame = source.read(captured_length)
+        if len(frame) < captured_length:
+            return
+        line = frame_to_line(linktype, frame)
+        if line:
+            yield line
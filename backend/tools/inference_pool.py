@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from config import (CLASSIFIER_MODEL_NAME, CLASSIFIER_BATCH_SIZE, INFERENCE_WORKERS,
+                    INFERENCE_THREADS_PER_WORKER, INFERENCE_CHUNK_SIZE, INFERENCE_MAX_PENDING_CHUNKS)
+from tools.attack_detection import PcapClassifier, VerdictCache, CLASSES, WARM_UP_LINE, plan_stats, classify_capture, warm_up
+from instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+_worker_classifier = None
+
+def _init_worker(model_name: str, batch_size: int, num_threads: int) -> None:
+    """Load the model once per worker process."""
+    global _worker_classifier
+    _worker_classifier = PcapClassifier(model_name, batch_size=batch_size, num_threads=num_threads)
+
+def _predict_chunk(lines: list) -> list:
+    return _worker_classifier.predict(lines)
+
+class InferencePool:
+    """Process pool that classifies PCAP files across cores without blocking the event loop.
+
+    The parent parses the capture and plans the work (flow sampling, deduplication, verdict
+    cache); the unique lines left for the model are split into chunks and predicted in
+    parallel by workers that each hold their own copy of the model.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads_per_worker: int = INFERENCE_THREADS_PER_WORKER,
+                 chunk_size: int = INFERENCE_CHUNK_SIZE, max_pending_chunks: int = INFERENCE_MAX_PENDING_CHUNKS,
+                 model_name: str = CLASSIFIER_MODEL_NAME, batch_size: int = CLASSIFIER_BATCH_SIZE):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks or 2 * workers
+        self.cache = VerdictCache()
+        self.last_stats = {}
+        self.queued_chunks = 0
+        self.running_chunks = 0
+        self._slots = asyncio.Semaphore(self.max_pending_chunks)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, batch_size, threads_per_worker)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        """True when new work has to wait for a free slot."""
+        return self.queued_chunks > 0
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued_chunks": self.queued_chunks,
+            "running_chunks": self.running_chunks,
+            "max_pending_chunks": self.max_pending_chunks,
+            "saturated": self.saturated,
+            **{f"cache_{key}": value for key, value in self.cache.stats().items()},
+        }
+
+    async def _predict_one(self, lines: list) -> list:
+        self.queued_chunks += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued_chunks -= 1
+        self.running_chunks += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, _predict_chunk, lines)
+        finally:
+            self.running_chunks -= 1
+            self._slots.release()
+
+    async def predict(self, lines: list) -> list:
+        """Predict class indices for feature strings, spreading chunks over the workers."""
+        chunks = [lines[start:start + self.chunk_size] for start in range(0, len(lines), self.chunk_size)]
+        results = await asyncio.gather(*(self._predict_one(chunk) for chunk in chunks))
+        return [predicted_class for result in results for predicted_class in result]
+
+    async def classify_pcap(self, file_path: str) -> dict:
+        """Classify packets in a PCAP file and return attack type counts."""
+        started = time.perf_counter()
+        plan = await asyncio.to_thread(PcapClassifier.plan_pcap, file_path, self.cache)
+        pending = await asyncio.to_thread(plan.pending)
+        with stage("inference"):
+            predictions = await self.predict(pending)
+        packets_brief = plan.resolve(pending, predictions, CLASSES)
+        self.last_stats = plan_stats(plan, len(pending), time.perf_counter() - started, self.cache)
+        return packets_brief
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_pool = None
+
+def get_inference_pool():
+    """Return the shared inference pool, or None when INFERENCE_WORKERS is 0."""
+    global _pool
+    if _pool is None and INFERENCE_WORKERS > 0:
+        _pool = InferencePool()
+    return _pool
+
+async def warm_up_detection(delay: float = 0) -> None:
+    """Load the model wherever inference will run: in this process, or in every pool worker."""
+    # Importing torch holds the GIL for seconds; waiting lets startup work such as the first metrics go out first.
+    await asyncio.sleep(delay)
+    pool = get_inference_pool()
+    if pool is None:
+        await asyncio.to_thread(warm_up)
+    else:
+        await asyncio.gather(*(pool.predict([WARM_UP_LINE]) for _ in range(pool.workers)))
+
+def inference_pool_stats() -> dict:
+    return _pool.stats() if _pool is not None else {}
+
+def shutdown_inference_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+async def classify_capture_async(path: str) -> dict:
+    """Return attack type counts for a PCAP file without blocking the event loop."""
+    pool = get_inference_pool()
+    if pool is None:
+        return await asyncio.to_thread(classify_capture, path)
+    results = await pool.classify_pcap(path)
+    stats = pool.last_stats
+    logger.info(f"Classified {stats['packets']} packets in {stats['flows']} flows in {stats['seconds']:.2f}s "
+                f"on {pool.workers} workers ({stats['packets_per_sec']:.1f} packets/sec, "
+                f"{stats['inferred']} model inferences, cache hit rate {stats['cache_hit_rate']:.1%})")
+    return results
+
+async def detect_attack_async(path: str) -> str:
+    """Detect attacks in a PCAP file without blocking the event loop."""
+    return str(await classify_capture_async(path))
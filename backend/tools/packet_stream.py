@@ -0,0 +1,178 @@
+import asyncio
+import os
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import IO, Awaitable, Callable, Optional
+from config import STREAMING_POLL_INTERVAL, STREAMING_FLUSH_INTERVAL, STREAMING_MAX_PENDING_CHUNKS, FAST_PCAP_PARSER
+from tools.fast_pcap import parse_global_header, iter_stream_lines, UnsupportedCaptureError
+
+logger = logging.getLogger(__name__)
+
+class TailReader:
+    """Blocking file-like reader that follows a pcap file while it is still being written."""
+
+    def __init__(self, path: str, is_done: Callable[[], bool], poll_interval: float = STREAMING_POLL_INTERVAL):
+        self.name = path
+        self.is_done = is_done
+        self.poll_interval = poll_interval
+        self._file = None
+
+    def _open(self) -> bool:
+        if self._file is None and os.path.exists(self.name):
+            self._file = open(self.name, "rb")
+        return self._file is not None
+
+    def read(self, size: int = -1) -> bytes:
+        buf = b""
+        while size < 0 or len(buf) < size:
+            if self._open():
+                chunk = self._file.read(-1 if size < 0 else size - len(buf))
+                if chunk:
+                    buf += chunk
+                    continue
+            if self.is_done():
+                # The writer has exited; whatever is on disk now is all there is.
+                if self._open():
+                    buf += self._file.read(-1 if size < 0 else size - len(buf))
+                return buf
+            time.sleep(self.poll_interval)
+        return buf
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class _ReplayReader:
+    """Replays bytes already consumed from a stream before reading the rest of it."""
+
+    def __init__(self, head: bytes, source):
+        self.name = getattr(source, "name", "stream")
+        self._head = head
+        self._source = source
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._head:
+            return self._source.read(size)
+        if size < 0 or size > len(self._head):
+            data, self._head = self._head, b""
+            return data + self._source.read(-1 if size < 0 else size - len(data))
+        data, self._head = self._head[:size], self._head[size:]
+        return data
+
+    def close(self) -> None:
+        self._source.close()
+
+@dataclass
+class CaptureStream:
+    """A capture in progress, readable either from a tshark pipe or from its growing output file."""
+    path: str
+    is_done: Callable[[], bool]
+    pipe: Optional[IO[bytes]] = None
+
+    def open(self):
+        return self.pipe if self.pipe is not None else TailReader(self.path, self.is_done)
+
+def _iter_stream_lines(source, classifier):
+    """Yield feature strings from a pcap byte stream, preferring the fast parser."""
+    if FAST_PCAP_PARSER:
+        header = source.read(24)
+        if not header:
+            return
+        try:
+            endian, linktype = parse_global_header(header)
+        except UnsupportedCaptureError as e:
+            logger.info(f"Fast parser unavailable for stream ({e}); using scapy.")
+            source = _ReplayReader(header, source)
+        else:
+            yield from iter_stream_lines(source, endian, linktype)
+            return
+    from scapy.all import PcapReader
+    with PcapReader(source) as pcap:
+        for pkt in pcap:
+            input_line = classifier.processing_packet_conversion(pkt)
+            if input_line:
+                yield input_line
+
+class _PendingLines:
+    """Feature strings read but not yet handed to the classifier, shared by the reader thread and the event loop."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self._lines = []
+        self._lock = threading.Lock()
+
+    def add(self, line: str) -> Optional[list]:
+        """Buffer a line; return a full chunk once batch_size lines are waiting."""
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) < self.batch_size:
+                return None
+            chunk, self._lines = self._lines, []
+            return chunk
+
+    def take(self) -> list:
+        """Return whatever is waiting, however few lines that is."""
+        with self._lock:
+            chunk, self._lines = self._lines, []
+            return chunk
+
+def _produce_lines(stream: CaptureStream, classifier, loop: asyncio.AbstractEventLoop,
+                   queue: asyncio.Queue, pending: _PendingLines) -> None:
+    """Read packets as they are captured and push full feature-string chunks onto the queue, then None."""
+    def push(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    source = stream.open()
+    try:
+        for input_line in _iter_stream_lines(source, classifier):
+            chunk = pending.add(input_line)
+            if chunk:
+                push(chunk)
+    finally:
+        chunk = pending.take()
+        if chunk:
+            push(chunk)
+        push(None)
+        source.close()
+
+async def stream_classify(stream: CaptureStream, classifier,
+                          on_update: Optional[Callable[[dict], Awaitable[None]]] = None,
+                          flush_interval: float = STREAMING_FLUSH_INTERVAL) -> dict:
+    """Classify packets while they are being captured, reporting partial counts as they change.
+
+    Full batches are classified as soon as they are read; when no batch arrives for
+    `flush_interval` seconds, the lines read so far are classified anyway, so packets
+    surface during a lull in traffic instead of waiting for the next one.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=STREAMING_MAX_PENDING_CHUNKS)
+    pending = _PendingLines(classifier.batch_size)
+    producer = asyncio.create_task(asyncio.to_thread(_produce_lines, stream, classifier, loop, queue, pending))
+    packets_brief = {}
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), flush_interval)
+            except asyncio.TimeoutError:
+                chunk = pending.take()
+                if not chunk:
+                    continue
+            if chunk is None:
+                # Re-raises a read error, so a capture that broke off is not taken for a quiet one.
+                await producer
+                break
+            counts = await asyncio.to_thread(classifier.classify_lines, chunk)
+            for attack, count in counts.items():
+                packets_brief[attack] = packets_brief.get(attack, 0) + count
+            if on_update is not None:
+                await on_update(dict(packets_brief))
+    finally:
+        while not producer.done():
+            # Drain so the producer thread is never left blocked on a full queue.
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({producer}, timeout=flush_interval)
+    return packets_brief
@@ -0,0 +1,65 @@
+import math
+from common_classes import ParameterResult
+from config import (TUNING_LATENCY_BUCKET_MS, TUNING_LOSS_BUCKET_PCT, TUNING_LATENCY_THRESHOLD_MS,
+                    TUNING_LOSS_THRESHOLD_PCT, TUNING_DURATION_RANGE, TUNING_INTERVAL_RANGE)
+
+class HeuristicTuner:
+    """Deterministic version of the parameter tuning agent's guidelines, memoized on bucketed inputs.
+
+    Latency, loss and the previous attack flag are folded into a severity between 0 and 1;
+    severity scales the capture duration up and the cycle interval down across their ranges.
+    Any attack, latency above the threshold or loss above the threshold puts severity in the
+    upper half, so duration increases and interval decreases; otherwise both move the other way.
+    """
+
+    def __init__(self, latency_bucket_ms: float = TUNING_LATENCY_BUCKET_MS, loss_bucket_pct: float = TUNING_LOSS_BUCKET_PCT):
+        self.latency_bucket_ms = latency_bucket_ms
+        self.loss_bucket_pct = loss_bucket_pct
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, avg_latency, avg_loss, previous_attack_detected: bool) -> tuple:
+        """Map raw inputs to the memo key; missing measurements count as zero."""
+        latency = avg_latency or 0.0
+        loss = avg_loss or 0.0
+        elevated = bool(previous_attack_detected) or latency > TUNING_LATENCY_THRESHOLD_MS or loss > TUNING_LOSS_THRESHOLD_PCT
+        return (int(latency // self.latency_bucket_ms), int(loss // self.loss_bucket_pct),
+                bool(previous_attack_detected), elevated)
+
+    def _decide(self, key: tuple) -> ParameterResult:
+        latency_bucket, loss_bucket, previous_attack_detected, elevated = key
+        latency = (latency_bucket + 0.5) * self.latency_bucket_ms
+        loss = (loss_bucket + 0.5) * self.loss_bucket_pct
+        severity = max(
+            1.0 if previous_attack_detected else 0.0,
+            min(latency / (2 * TUNING_LATENCY_THRESHOLD_MS), 1.0),
+            min(loss / (2 * TUNING_LOSS_THRESHOLD_PCT), 1.0),
+        )
+        severity = max(severity, 0.5) if elevated else min(severity, 0.45)
+        min_duration, max_duration = TUNING_DURATION_RANGE
+        min_interval, max_interval = TUNING_INTERVAL_RANGE
+        return ParameterResult(
+            duration=math.ceil(min_duration + (max_duration - min_duration) * severity),
+            interval=math.floor(max_interval - (max_interval - min_interval) * severity)
+        )
+
+    def tune(self, avg_latency, avg_loss, previous_attack_detected: bool) -> ParameterResult:
+        """Return capture duration and cycle interval for the given network conditions."""
+        key = self.bucket(avg_latency, avg_loss, previous_attack_detected)
+        result = self.memo.get(key)
+        if result is None:
+            self.misses += 1
+            result = self.memo[key] = self._decide(key)
+        else:
+            self.hits += 1
+        return result
+
+    def learn(self, key: tuple, result: ParameterResult) -> None:
+        """Replace the memoized decision for a bucket, e.g. with advice from the LLM."""
+        min_duration, max_duration = TUNING_DURATION_RANGE
+        min_interval, max_interval = TUNING_INTERVAL_RANGE
+        self.memo[key] = ParameterResult(
+            duration=min(max(result.duration, min_duration), max_duration),
+            interval=min(max(result.interval, min_interval), max_interval)
+        )
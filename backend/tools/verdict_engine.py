@@ -0,0 +1,62 @@
+from typing import Optional
+from common_classes import AnalysisResult
+from config import VERDICT_ATTACK_RATIO, VERDICT_NORMAL_RATIO, VERDICT_MIN_PACKETS, CLASS_SEVERITY
+
+NORMAL_CLASS = "Normal"
+
+class VerdictEngine:
+    """Rule-based attack verdict computed directly from per-class packet counts.
+
+    Attack classes are weighted by their severity and compared with the Normal count.
+    When Normal is at most VERDICT_ATTACK_RATIO times the weighted attack traffic the
+    capture is an attack; at VERDICT_NORMAL_RATIO times or more it is clean. Anything
+    in between, or any attack traffic in a capture under VERDICT_MIN_PACKETS, is
+    ambiguous and left to the LLM.
+    """
+
+    def __init__(self, attack_ratio: float = VERDICT_ATTACK_RATIO, normal_ratio: float = VERDICT_NORMAL_RATIO,
+                 min_packets: int = VERDICT_MIN_PACKETS, severity: dict = CLASS_SEVERITY):
+        self.attack_ratio = attack_ratio
+        self.normal_ratio = normal_ratio
+        self.min_packets = min_packets
+        self.severity = severity
+        self.fast_path_decisions = 0
+        self.escalations = 0
+
+    def decide(self, packets_brief: dict) -> Optional[AnalysisResult]:
+        """Return a verdict for clear-cut counts, or None when the LLM should decide."""
+        total = sum(packets_brief.values())
+        normal = packets_brief.get(NORMAL_CLASS, 0)
+        attacks = {attack: count for attack, count in packets_brief.items() if attack != NORMAL_CLASS and count}
+        weighted_attack = sum(count * self.severity.get(attack, 1.0) for attack, count in attacks.items())
+        if not weighted_attack:
+            self.fast_path_decisions += 1
+            return AnalysisResult(attack_detected=False, details=self._describe(total, normal, attacks))
+        if total < self.min_packets:
+            # Too few packets for the ratios to mean much, and a slow scan looks exactly like this.
+            self.escalations += 1
+            return None
+        ratio = normal / weighted_attack
+        if ratio <= self.attack_ratio or ratio >= self.normal_ratio:
+            self.fast_path_decisions += 1
+            return AnalysisResult(attack_detected=ratio <= self.attack_ratio,
+                                  details=self._describe(total, normal, attacks))
+        self.escalations += 1
+        return None
+
+    @staticmethod
+    def _describe(total: int, normal: int, attacks: dict) -> str:
+        if not total:
+            return "No TCP packets were classified in the capture."
+        top = sorted(attacks.items(), key=lambda item: item[1], reverse=True)[:3]
+        top_text = ", ".join(f"{attack} ({count})" for attack, count in top) or "none"
+        return (f"{normal} of {total} packets classified as Normal; "
+                f"{total - normal} as attack traffic. Top attack classes: {top_text}.")
+
+    def stats(self) -> dict:
+        decisions = self.fast_path_decisions + self.escalations
+        return {
+            "fast_path_decisions": self.fast_path_decisions,
+            "llm_escalations": self.escalations,
+            "fast_path_ratio": self.fast_path_decisions / decisions if decisions else 0.0,
+        }